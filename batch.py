@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
+
+def collect_inputs(inputs, file_list, extensions):
+    """Expand input roots and an optional file list into a sorted list of matching files."""
+    files = set()
+    if file_list:
+        with open(file_list, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    files.add(os.path.abspath(line))
+
+    for root in inputs:
+        if os.path.isfile(root):
+            files.add(os.path.abspath(root))
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.lower().endswith(extensions):
+                    files.add(os.path.abspath(os.path.join(dirpath, filename)))
+    return sorted(files)
+
+def load_journal(journal_path):
+    """Returns the set of files a previous run already completed."""
+    if not journal_path or not os.path.exists(journal_path):
+        return set()
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+def run_item(func, path):
+    """Runs one batch item in a worker process: returns (path, ok, input bytes)."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return path, None, 0  # Already gone, e.g. converted by an earlier run
+    try:
+        return path, bool(func(path)), size
+    except Exception as e:
+        logging.error(f"Batch processing failed for {path}: {e}")
+        return path, False, size
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def run_batch(name, files, func, initializer=None, initargs=(), workers=None, journal_path=None):
+    """Processes files with a worker pool, skipping journaled files; returns the exit code.
+
+    Every completed file is appended to the journal, so a stopped run resumes by
+    running the same command again.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    done = load_journal(journal_path)
+    pending = [path for path in files if path not in done]
+    total = len(pending)
+    print(f"[{name}] {len(files)} files, {len(files) - total} already done, {total} to process with {workers} workers")
+
+    completed = failed = skipped = processed_bytes = 0
+    started = last_report = time.monotonic()
+    journal = open(journal_path, 'a', encoding='utf-8') if journal_path else None
+    interrupted = False
+
+    def report(final=False):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        rate = completed / elapsed
+        eta = (total - completed - failed - skipped) / rate if rate else 0
+        line = (f"[{name}] {completed + failed + skipped}/{total} done, {failed} failed, {skipped} skipped, "
+                f"{rate:.1f} files/s, {processed_bytes / elapsed / 1e6:.1f} MB/s")
+        if final:
+            print(f"{line}, elapsed {format_duration(elapsed)}")
+        else:
+            print(f"{line}, ETA {format_duration(eta)}", flush=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+            queue = iter(pending)
+            in_flight = {}
+            try:
+                while True:
+                    # Keep the pool busy without materialising a future per input file
+                    while len(in_flight) < workers * 4:
+                        path = next(queue, None)
+                        if path is None:
+                            break
+                        in_flight[executor.submit(run_item, func, path)] = path
+                    if not in_flight:
+                        break
+
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        path = in_flight.pop(future)
+                        try:
+                            _, ok, size = future.result()
+                        except Exception as e:
+                            ok, size = False, 0
+                            logging.error(f"Worker failed for {path}: {e}")
+                        if ok is None:
+                            skipped += 1
+                        elif ok:
+                            completed += 1
+                            processed_bytes += size
+                            if journal:
+                                journal.write(path + '\n')
+                                journal.flush()
+                        else:
+                            failed += 1
+                            print(f"[{name}] FAILED: {path}", file=sys.stderr)
+
+                    if time.monotonic() - last_report >= 2:
+                        last_report = time.monotonic()
+                        report()
+            except KeyboardInterrupt:
+                interrupted = True
+                for future in in_flight:
+                    future.cancel()
+                print(f"[{name}] Interrupted, waiting for running items to finish...", file=sys.stderr)
+    finally:
+        if journal:
+            journal.close()
+
+    report(final=True)
+    if interrupted:
+        hint = " with the same --journal" if journal_path else ""
+        print(f"[{name}] Run stopped early; rerun the same command{hint} to resume.", file=sys.stderr)
+        return 130
+    return 1 if failed else 0
+
+class FolderPool:
+    """Worker processes converting the files of one folder in watch mode.
+
+    The pool is started on first use and kept between folders; it is only
+    restarted when the requested worker count changes. Workers are spawned
+    rather than forked because the watching process runs other threads.
+    """
+
+    context = multiprocessing.get_context("spawn")  # Also for queues handed to the workers
+
+    def __init__(self, initializer=None, initargs=()):
+        self.initializer = initializer
+        self.initargs = initargs
+        self.executor = None
+        self.workers = 0
+
+    def imap_unordered(self, func, items, workers):
+        """Runs func on every item with the given number of workers; yields (item, result) as each one finishes."""
+        if self.executor is None or workers != self.workers:
+            self.close()
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=self.context,
+                initializer=self.initializer, initargs=self.initargs
+            )
+            self.workers = workers
+        futures = {self.executor.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,235 @@
+import io
+import os
+import json
+import time
+import shutil
+import struct
+import logging
+import tempfile
+import threading
+import tracing
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# Bucket state shared by the processors of this host, one small file per bucket
+STATE_DIR = os.path.join(tempfile.gettempdir(), "file_processor_io")
+STATE_FORMAT = "<ddddd"  # Byte tokens, operation tokens, time of the last refill, byte rate, operation rate
+STATE_SIZE = struct.calcsize(STATE_FORMAT)
+
+# A bucket holds at most this many seconds of its rate
+BURST_SECONDS = 1.0
+
+# Large jobs leave this many seconds of tokens to small jobs, so small jobs go first under contention
+RESERVE_SECONDS = 0.25
+
+# Jobs up to these sizes count as small
+SMALL_JOB_PAGES = 10
+SMALL_JOB_BYTES = 16 * 1024 * 1024
+
+# Longest single sleep before the buckets are checked again
+MAX_SLEEP = 0.5
+
+def lock_file(f):
+    f.seek(0)
+    if os.name == "nt":
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+def unlock_file(f):
+    f.seek(0)
+    if os.name == "nt":
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class TokenBucket:
+    """A token bucket on bytes and operations per second whose state is shared through a locked file."""
+
+    def __init__(self, path, bytes_per_second=0, ops_per_second=0):
+        self.path = path
+        self.rates = (bytes_per_second or 0, ops_per_second or 0)  # 0 leaves a dimension unlimited
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)), "r+b", buffering=0)
+
+    def read(self, now):
+        self.file.seek(0)
+        data = self.file.read(STATE_SIZE)
+        if len(data) < STATE_SIZE:
+            return [rate * BURST_SECONDS for rate in self.rates], now  # New bucket starts full
+        byte_tokens, op_tokens, last, *rates = struct.unpack(STATE_FORMAT, data)
+        elapsed = max(now - last, 0)
+        tokens = []
+        for have, rate, old_rate in zip((byte_tokens, op_tokens), self.rates, rates):
+            if rate != old_rate:
+                have = max(have, 0)  # Debt run up under other limits is dropped when they change
+            tokens.append(min(have + elapsed * rate, rate * BURST_SECONDS))
+        return tokens, now
+
+    def take(self, tokens, amounts, now):
+        """Stores tokens less amounts; unlimited dimensions are neither charged nor can run into debt."""
+        remaining = [have - amount if rate else 0.0 for have, amount, rate in zip(tokens, amounts, self.rates)]
+        self.file.seek(0)
+        self.file.write(struct.pack(STATE_FORMAT, remaining[0], remaining[1], now, *self.rates))
+
+    def shortfall(self, tokens, amounts, reserve):
+        """Seconds until the bucket holds amounts (plus the reserve of large jobs), 0 if it already does."""
+        wait = 0.0
+        for have, amount, rate in zip(tokens, amounts, self.rates):
+            if not rate or not amount:
+                continue
+            # Requests larger than the burst are let through once the bucket is full
+            required = min(amount + reserve * rate, rate * BURST_SECONDS)
+            if have < required:
+                wait = max(wait, (required - have) / rate)
+        return wait
+
+    def close(self):
+        self.file.close()
+
+class IOGovernor:
+    """Throttles the page writes and moves of a processor against global and per-profile limits.
+
+    Limits come from config.json, "io_limits" at the top level for all profiles
+    together and in a profile's entry for that profile, each with
+    "bytes_per_second" and "ops_per_second" (0 or missing: unlimited). The
+    buckets are shared by all processors on this host. Jobs of up to
+    SMALL_JOB_PAGES pages (or SMALL_JOB_BYTES for moves) may drain a bucket;
+    larger jobs leave RESERVE_SECONDS of tokens, so small jobs go first.
+    Waiting time is added up in waited and recorded as "io_wait" trace spans.
+    """
+
+    def __init__(self, state_dir=STATE_DIR):
+        self.state_dir = state_dir
+        self.buckets = []
+        self.lock = threading.Lock()
+        self.waited = 0.0
+        self.config_file = None
+        self.profile = None
+        self.mtime = None
+        self.limits = None
+
+    def configure(self, global_limits, profile_limits, profile=None):
+        with self.lock:
+            for bucket in self.buckets:
+                bucket.close()
+            self.buckets = []
+            for name, limits in (("global", global_limits), (f"profile_{profile}", profile_limits)):
+                limits = limits or {}
+                if limits.get("bytes_per_second") or limits.get("ops_per_second"):
+                    self.buckets.append(TokenBucket(
+                        os.path.join(self.state_dir, f"{name}.bucket"),
+                        limits.get("bytes_per_second"), limits.get("ops_per_second")
+                    ))
+
+    def follow_config(self, config_file, profile):
+        """Takes the limits from config_file and rereads them when check_config() sees it change."""
+        self.config_file = config_file
+        self.profile = profile
+        self.check_config()
+
+    def check_config(self):
+        if self.config_file is None:
+            return
+        try:
+            mtime = os.stat(self.config_file).st_mtime_ns
+            if mtime == self.mtime:
+                return
+            with open(self.config_file, 'r') as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            return  # Missing or half written, try again on the next check
+        self.mtime = mtime
+        limits = (config.get("io_limits"), config.get("profiles", {}).get(self.profile, {}).get("io_limits"))
+        if limits != self.limits:
+            self.limits = limits
+            self.configure(limits[0], limits[1], self.profile)
+            logging.info(f"I/O limits: all profiles {limits[0] or 'unlimited'}, this profile {limits[1] or 'unlimited'}")
+
+    def acquire(self, nbytes, ops=1, small=False):
+        """Blocks until nbytes and ops may be spent; returns the seconds waited."""
+        if not self.buckets:
+            return 0.0
+        started = time.perf_counter()
+        start_us = tracing.now_us()
+        reserve = 0.0 if small else RESERVE_SECONDS
+        while True:
+            # The lock covers one look at the buckets, not the sleep, so new limits apply while throttled
+            with self.lock:
+                if not self.buckets:
+                    break  # Limits were removed while waiting
+                # Every process locks the buckets in the same order (global first)
+                for bucket in self.buckets:
+                    lock_file(bucket.file)
+                try:
+                    now = time.time()
+                    states = [bucket.read(now) for bucket in self.buckets]
+                    wait = max(
+                        bucket.shortfall(tokens, (nbytes, ops), reserve)
+                        for bucket, (tokens, _) in zip(self.buckets, states)
+                    )
+                    if wait == 0:
+                        for bucket, (tokens, _) in zip(self.buckets, states):
+                            bucket.take(tokens, (nbytes, ops), now)
+                        break
+                finally:
+                    for bucket in reversed(self.buckets):
+                        unlock_file(bucket.file)
+            time.sleep(min(wait, MAX_SLEEP))
+        waited = time.perf_counter() - started
+        with self.lock:
+            self.waited += waited
+        if waited >= 0.001:
+            tracing.record("io_wait", start_us, bytes=nbytes, ops=ops, small=small)
+        return waited
+
+    def save_image(self, img, path, format, small=False, **params):
+        """Saves a Pillow image, encoded in memory first so its size is known before it is written.
+
+        Returns the encoded bytes, e.g. for a checksum without reading the file back.
+        """
+        buffer = io.BytesIO()
+        img.save(buffer, format, **params)
+        data = buffer.getbuffer()
+        self.acquire(len(data), 1, small)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return data
+
+    def move(self, src, dest, small=None):
+        """shutil.move of a file or folder: one operation for a rename, the bytes and files for a copy."""
+        if not self.buckets:
+            shutil.move(src, dest)
+            return
+        if same_device(src, os.path.dirname(os.path.abspath(dest))):
+            self.acquire(0, 1, True if small is None else small)
+        else:
+            nbytes, files = tree_size(src)
+            self.acquire(nbytes, max(files, 1), nbytes <= SMALL_JOB_BYTES if small is None else small)
+        shutil.move(src, dest)
+
+    def close(self):
+        self.configure(None, None)
+
+def tree_size(path):
+    """Returns (bytes, files) of a file or of everything below a folder."""
+    if not os.path.isdir(path):
+        return os.path.getsize(path), 1
+    nbytes = files = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                nbytes += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                continue
+    return nbytes, files
+
+def same_device(src, dest_dir):
+    try:
+        return os.stat(src).st_dev == os.stat(dest_dir).st_dev
+    except OSError:
+        return False
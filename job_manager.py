@@ -1,15 +1,31 @@
 import os
 import sys
 import json
+import time
 import shutil
+import threading
 import subprocess
 import multiprocessing
+import profiling
+import stats
+import render_settings
+
+# Delay before restarting a processor that exited soon after it started, doubled per exit up to the maximum
+RESTART_DELAY = 5
+MAX_RESTART_DELAY = 300
+
+# A processor that ran at least this long before exiting is restarted right away
+STABLE_RUN_SECONDS = 60
 
 class JobManager:
     def __init__(self, config_file):
         """Initialize the JobManager with a path to the config file."""
         self.config_file = config_file
         self.processes = {}  # Keep track of running processes (one per job)
+        self.started = {}  # (profile, processor) -> monotonic start time
+        self.quick_exits = {}  # (profile, processor) -> exits in a row soon after starting
+        self.restart_at = {}  # (profile, processor) -> monotonic time an exited processor may restart
+        self.reapers = []  # Threads waiting for stopped processors to exit
         self.load_config()
 
     def load_config(self):
@@ -62,7 +78,8 @@ class JobManager:
             "JPEG": jpeg_folder,
             "TIFF": tiff_folder,
             "COMPLETE": complete_folder,
-            "status": "Active"
+            "status": "Active",
+            "render": dict(render_settings.DEFAULTS)
         }
         self.save_config()
 
@@ -107,6 +124,31 @@ class JobManager:
             self.start_processor(profile_name, "jpeg_processor.py", profile["JPEG"], profile["COMPLETE"])
             self.start_processor(profile_name, "tiff_processor.py", profile["TIFF"], profile["COMPLETE"])
 
+    def get_render_settings(self, profile_name):
+        """Returns the effective render settings of a profile."""
+        return render_settings.profile_settings(self.config['profiles'][profile_name])
+
+    def update_render_settings(self, profile_name, **changes):
+        """Changes render settings of a profile; its running processors apply them from their next file."""
+        if profile_name not in self.config['profiles']:
+            return
+        profile = self.config['profiles'][profile_name]
+        render = dict(profile.get('render', {}), **changes)
+        render_settings.profile_settings(dict(profile, render=render))  # Raises ValueError before anything is saved
+        profile['render'] = render
+        self.save_config()
+
+    def update_io_limits(self, bytes_per_second=0, ops_per_second=0, profile_name=None):
+        """Limits the page writes and folder moves of one profile, or of all profiles together (0: unlimited)."""
+        limits = {"bytes_per_second": bytes_per_second, "ops_per_second": ops_per_second}
+        if profile_name is None:
+            self.config['io_limits'] = limits
+        elif profile_name in self.config['profiles']:
+            self.config['profiles'][profile_name]['io_limits'] = limits
+        else:
+            return
+        self.save_config()
+
     def toggle_profile_status(self, profile_name):
         """Toggles the profile status between active and paused."""
         if profile_name in self.config['profiles']:
@@ -116,39 +158,145 @@ class JobManager:
             else:
                 self.unpause_profile(profile_name)
 
+    def trigger_profiling(self, profile_name, seconds=None, files=None):
+        """Asks the running processors of a profile to profile themselves for N seconds or N files."""
+        if profile_name not in self.config['profiles']:
+            return
+        profile = self.config['profiles'][profile_name]
+        for watch_key in ("JPEG", "TIFF"):
+            profiling.write_request(profile[watch_key], seconds=seconds, files=files)
+        print(f"Requested profiling for profile {profile_name}, results in {self.get_log_dir()}")
+
+    def get_log_dir(self):
+        """Returns the processor log directory, by default 'logs' next to the config file."""
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(self.config_file)), "logs")
+        return self.config.get('log_dir') or default_dir
+
+    def get_stats_port(self):
+        """Returns the local UDP port processors push dashboard stats to (0 disables)."""
+        return self.config.get('stats_port', stats.DEFAULT_STATS_PORT)
+
+    def processor_command(self, processor_name, watch_dir, output_dir, profile_name=None):
+        """Build the command line for a processor (JPEG/TIFF), using the .exe when frozen."""
+        if getattr(sys, 'frozen', False):
+            exe_dir = os.path.dirname(sys.executable)
+            if processor_name.endswith('.py'):
+                processor_name = os.path.splitext(processor_name)[0] + '.exe'
+            command = [os.path.join(exe_dir, processor_name)]
+        else:
+            # Run the script with the current interpreter so it works without file associations
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            command = [sys.executable, os.path.join(script_dir, processor_name)]
+        command += ['--watch-dir', watch_dir, '--output-dir', output_dir, '--log-dir', self.get_log_dir()]
+        if profile_name:
+            # Render settings are read from the profile's entry and followed while the processor runs
+            command += ['--profile', profile_name, '--config', os.path.abspath(self.config_file)]
+        if self.config.get('page_log_every', 1) > 1:
+            command += ['--page-log-every', str(self.config['page_log_every'])]
+        if self.get_stats_port():
+            command += ['--stats-port', str(self.get_stats_port())]
+        if self.config.get('trace_dir'):
+            command += ['--trace-dir', self.config['trace_dir']]
+        if self.config.get('shared_leases'):
+            # Several hosts process this network folder, claim items through lease files
+            command += ['--shared', '--lease-ttl', str(self.config.get('lease_ttl', 120))]
+        return command
+
     def start_processor(self, profile_name, processor_name, watch_dir, output_dir):
         """Start a processor (JPEG/TIFF) using the appropriate .exe or .py file."""
         if profile_name not in self.processes:
             self.processes[profile_name] = {}
 
-        log_file = f"{profile_name}_{processor_name}.log"
-        with open(log_file, "w") as log:
+        # Processors write their own rotating JSON log; only crash output lands in this file
+        log_dir = self.get_log_dir()
+        os.makedirs(log_dir, exist_ok=True)
+        log_file = os.path.join(log_dir, f"{profile_name}_{os.path.splitext(processor_name)[0]}.stderr.log")
+        with open(log_file, "a") as log:
             try:
-                # Check if running as an executable
-                if getattr(sys, 'frozen', False):
-                    exe_dir = os.path.dirname(sys.executable)
-                    if processor_name.endswith('.py'):
-                        processor_name = os.path.splitext(processor_name)[0] + '.exe'
-                    processor_path = os.path.join(exe_dir, processor_name)
-                else:
-                    processor_path = processor_name
-
-                # Start the processor
+                # Start the processor (CREATE_NO_WINDOW only exists on Windows)
                 process = subprocess.Popen(
-                    [processor_path, '--watch-dir', watch_dir, '--output-dir', output_dir],
-                    stdout=log, stderr=log, creationflags=subprocess.CREATE_NO_WINDOW
+                    self.processor_command(processor_name, watch_dir, output_dir, profile_name),
+                    stdout=subprocess.DEVNULL, stderr=log, creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
                 )
-                print(f"Started {processor_name} for profile {profile_name}, log output in {log_file}")
+                print(f"Started {processor_name} for profile {profile_name}, logs in {log_dir}")
                 self.processes[profile_name][processor_name] = process
+                self.started[(profile_name, processor_name)] = time.monotonic()
                 return process  # Returning the process
             except Exception as e:
                 print(f"Error starting {processor_name} for profile {profile_name}: {e}")
                 return None
 
-    def stop_processor(self, profile_name):
-        """Stop any running processors for the given profile."""
-        if profile_name in self.processes:
-            for processor_name, process in self.processes[profile_name].items():
-                process.terminate()
-                print(f"Terminated {processor_name} for profile {profile_name}")
-            del self.processes[profile_name]
+    def stop_processor(self, profile_name, timeout=10):
+        """Stop any running processors for the given profile.
+
+        Returns right after asking them to terminate; a background thread kills
+        those still running after timeout seconds, so the GUI isn't blocked.
+        """
+        for key in [key for key in self.quick_exits if key[0] == profile_name]:
+            del self.quick_exits[key]
+            self.restart_at.pop(key, None)
+        processes = self.processes.pop(profile_name, {})
+        if not processes:
+            return
+        for process in processes.values():
+            process.terminate()
+        reaper = threading.Thread(
+            target=self.reap, args=(profile_name, processes, timeout), name=f"reap-{profile_name}", daemon=True
+        )
+        reaper.start()
+        self.reapers = [thread for thread in self.reapers if thread.is_alive()] + [reaper]
+
+    def reap(self, profile_name, processes, timeout):
+        """Waits for terminated processors to exit, killing them after timeout seconds."""
+        deadline = time.monotonic() + timeout
+        for processor_name, process in processes.items():
+            try:
+                process.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            print(f"Terminated {processor_name} for profile {profile_name}")
+
+    def stop_all_processors(self):
+        """Stop the processors of every profile and wait until they have exited."""
+        for profile_name in list(self.processes):
+            self.stop_processor(profile_name)
+        for reaper in self.reapers:
+            reaper.join()
+        self.reapers = []
+
+    def restart_due(self, profile_name, processor_name, process):
+        """Returns whether an exited processor may be restarted now, backing off while it keeps exiting quickly."""
+        key = (profile_name, processor_name)
+        if key not in self.restart_at:
+            ran = time.monotonic() - self.started.get(key, 0)
+            quick_exits = self.quick_exits.get(key, 0) + 1 if ran < STABLE_RUN_SECONDS else 0
+            self.quick_exits[key] = quick_exits
+            delay = min(RESTART_DELAY * 2 ** (quick_exits - 1), MAX_RESTART_DELAY) if quick_exits else 0
+            self.restart_at[key] = time.monotonic() + delay
+            print(f"{processor_name} for profile {profile_name} exited with code {process.returncode} "
+                  f"after {ran:.0f}s, restarting in {delay}s")
+        if time.monotonic() < self.restart_at[key]:
+            return False
+        del self.restart_at[key]
+        return True
+
+    def sync_processors(self):
+        """Start missing or exited processors for active profiles and stop the rest."""
+        profiles = self.config.get('profiles', {})
+        for profile_name in list(self.processes):
+            profile = profiles.get(profile_name)
+            if profile is None or profile.get('status') != "Active":
+                self.stop_processor(profile_name)
+
+        for profile_name, profile in profiles.items():
+            if profile.get('status') != "Active":
+                continue
+            running = self.processes.get(profile_name, {})
+            for processor_name, watch_key in (("jpeg_processor.py", "JPEG"), ("tiff_processor.py", "TIFF")):
+                process = running.get(processor_name)
+                if process is not None and process.poll() is None:
+                    continue
+                if process is not None and not self.restart_due(profile_name, processor_name, process):
+                    continue
+                self.start_processor(profile_name, processor_name, profile[watch_key], profile["COMPLETE"])
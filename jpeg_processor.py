@@ -1,5 +1,6 @@
 import os
 import time
+import signal
 import shutil
 import sys
 from watchdog.observers import Observer
@@ -9,35 +10,83 @@ from PIL import Image
 import io
 import argparse
 import logging
-
-# Configure logging
-logging.basicConfig(
-    filename="jpeg_processor.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+import multiprocessing
+import batch
+import lease
+import page_analysis
+import pdf_loader
+import log_setup
+import tracing
+import profiling
+import stats
+import render_settings
+import io_governor
+import manifest
+
+# Files the processor converts, everything else in the watch folder is left alone
+INPUT_EXTENSIONS = (".pdf",)
+
+PROCESSOR = "jpeg_processor"  # Name used for log, trace and profile files
 
 def parse_args():
     parser = argparse.ArgumentParser(description="JPEG Processor")
-    parser.add_argument('--watch-dir', required=True, help='Directory to watch for new PDFs')
-    parser.add_argument('--output-dir', required=True, help='Directory to move completed files')
-    return parser.parse_args()
+    parser.add_argument('--watch-dir', help='Directory to watch for new PDFs')
+    parser.add_argument('--output-dir', help='Directory to move completed files')
+    parser.add_argument('--once', action='store_true', help='Convert the given inputs in one batch run and exit, without watching')
+    parser.add_argument('inputs', nargs='*', help='With --once: PDF files or folders to convert (searched recursively)')
+    parser.add_argument('--file-list', help='With --once: text file listing one PDF path per line')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='With --once: number of worker processes')
+    parser.add_argument('--journal', help='With --once: journal of completed files, rerun with the same journal to resume')
+    parser.add_argument('--gray-tolerance', type=int, default=0, help='Save pages whose RGB channels differ by at most this much as 8-bit grayscale (0 disables)')
+    parser.add_argument('--blank-pages', choices=('off', 'skip', 'tag'), default='off', help='Skip blank pages or only list them in a sidecar JSON')
+    parser.add_argument('--blank-threshold', type=float, default=0.001, help='Ink coverage (0-1) at or below which a page counts as blank')
+    parser.add_argument('--profile', help='Profile name, used in log file names and log records')
+    parser.add_argument('--config', help='config.json to read the render settings of --profile from; changes apply from the next file')
+    parser.add_argument('--log-dir', default='.', help='Directory for the rotating JSON log')
+    parser.add_argument('--page-log-every', type=int, default=1, help='Log only every Nth per-page record')
+    parser.add_argument('--stats-port', type=int, default=0, help='Push live stats to the dashboard on this local UDP port (0 disables)')
+    parser.add_argument('--trace-dir', help='Write Chrome/Perfetto trace events for every processed item to this directory')
+    parser.add_argument('--shared', action='store_true', help='Claim items with lease files so several hosts can share the watch folder')
+    parser.add_argument('--lease-dir', help='Lease folder for --shared (default: .leases next to the watch folder)')
+    parser.add_argument('--lease-ttl', type=float, default=120, help='Seconds before a lease of a silent host expires')
+    parser.add_argument('--node-id', help='Lease owner name (default: hostname:pid)')
+    args = parser.parse_args()
+    if args.once:
+        if not args.inputs and not args.file_list:
+            parser.error('--once needs input paths or --file-list')
+    elif not args.watch_dir or not args.output_dir:
+        parser.error('--watch-dir and --output-dir are required unless --once is given')
+    return args
 
 class PDFHandler(FileSystemEventHandler):
-    def __init__(self, output_directory, max_retries=10):
+    def __init__(self, output_directory, settings=None, check_stability=True, watch_directory=None, leases=None):
         self.output_directory = output_directory
-        self.max_retries = max_retries
+        self.settings = settings or dict(render_settings.DEFAULTS)  # Replaced as a whole when config.json changes
+        self.check_stability = check_stability  # Batch runs convert files that are already complete
+        self.watch_directory = watch_directory
+        self.profiling = None  # ProfilingController counting processed files
+        self.stats = None  # StatsReporter feeding the dashboard
+        self.governor = io_governor.IOGovernor()  # Unlimited until limits are configured
+        self.pool = None  # FolderPool converting the PDFs of a folder when settings ask for several workers
+        self.folder_manifest = None  # FolderManifest of the output folder being converted
+        # Claims items through leases when several hosts share the watch folder; the control file is picked up by the main loop
+        self.claims = lease.WatchFolderClaims(
+            watch_directory, self.handle_path, INPUT_EXTENSIONS, leases, ignore=(profiling.CONTROL_FILE,)
+        )
 
     def on_created(self, event):
         """Triggered when a new file or folder is created."""
-        if event.is_directory:
-            logging.info(f"New folder detected: {event.src_path}")
-            self.process_directory(event.src_path)
+        self.claims.claim_and_handle(event.src_path, event.is_directory)
+
+    def handle_path(self, path, is_directory):
+        if is_directory:
+            logging.info(f"New folder detected: {path}")
+            self.process_directory(path)
         else:
-            logging.info(f"New file detected: {event.src_path}")
-            if event.src_path.lower().endswith(".pdf"):
-                logging.info(f"PDF detected, starting processing: {event.src_path}")
-                self.process_pdf(event.src_path)
+            logging.info(f"New file detected: {path}")
+            if path.lower().endswith(".pdf"):
+                logging.info(f"PDF detected, starting processing: {path}")
+                self.process_pdf(path)
 
     def wait_for_file_stability(self, file_path, stability_duration=10):
         """Ensure the file is stable before processing."""
@@ -70,27 +119,86 @@ class PDFHandler(FileSystemEventHandler):
 
     def process_directory(self, folder_path):
         """Process all PDFs in a stable folder with retries."""
-        if not self.wait_for_file_stability(folder_path):
+        with tracing.span("stability_wait"):
+            stable = self.wait_for_file_stability(folder_path)
+        if not stable:
             logging.warning(f"Stability check failed for folder: {folder_path}")
             return
 
         destination_folder = os.path.join(self.output_directory, os.path.basename(folder_path))
-        self.move_folder(folder_path, destination_folder)
+        with tracing.span("move_folder"):
+            self.move_folder(folder_path, destination_folder)
 
         logging.info(f"Moved folder to output directory: {destination_folder}")
 
+        pdf_files = []
         for file in os.listdir(destination_folder):
             file_path = os.path.join(destination_folder, file)
             if file.lower().endswith(".pdf"):
-                if not self.process_pdf(file_path):
-                    logging.error(f"Failed to process PDF: {file_path}")
+                pdf_files.append(file_path)
             else:
                 logging.info(f"Skipping unsupported file: {file_path}")
 
+        settings = self.settings
+        self.folder_manifest = manifest.FolderManifest()
+        if self.stats is not None:
+            self.stats.folder_started(pdf_files)  # Out of the watch folder now, but still waiting
+        try:
+            if self.pool is not None and settings["workers"] > 1 and len(pdf_files) > 1:
+                self.process_in_pool(destination_folder, pdf_files, settings)
+            else:
+                for file_path in pdf_files:
+                    if not self.process_pdf(file_path):
+                        logging.error(f"Failed to process PDF: {file_path}")
+        finally:
+            folder_manifest, self.folder_manifest = self.folder_manifest, None
+            if self.stats is not None:
+                self.stats.folder_finished()
+
+        # Last step of publishing, consumers take the folder as done once it has a manifest
+        try:
+            with tracing.span("manifest"):
+                published = folder_manifest.publish(destination_folder, self.output_directory, PROCESSOR)
+            logging.info(f"Published {destination_folder} with a manifest of {len(published['files'])} files")
+        except Exception as e:
+            logging.error(f"Failed to write the manifest of {destination_folder}: {e}")
+
+    def process_in_pool(self, folder_path, pdf_files, settings):
+        """Converts the PDFs of a folder in parallel worker processes."""
+        workers = min(settings["workers"], len(pdf_files))
+        logging.info(f"Converting {len(pdf_files)} PDFs in {folder_path} with {workers} workers")
+        if self.stats is not None:
+            self.stats.file_started(folder_path, workers)
+        try:
+            with tracing.span("process_in_pool", workers=workers):
+                # Workers continue this folder's trace, pages are counted as each file finishes
+                trace_id = tracing.current_trace_id()
+                buffer_limit = pdf_loader.worker_buffer_limit(workers)
+                items = [(pdf_file, settings, trace_id, buffer_limit) for pdf_file in pdf_files]
+                for (pdf_file, *_), (ok, pages, file_manifest) in self.pool.imap_unordered(process_folder_file, items, workers):
+                    if not ok:
+                        logging.error(f"Failed to process PDF: {pdf_file}")
+                    self.folder_manifest.update(file_manifest)
+                    if self.stats is not None:
+                        self.stats.add_pages(pages)
+                    if self.profiling is not None:
+                        self.profiling.file_done()
+        except Exception as e:
+            logging.error(f"Worker pool failed for {folder_path}, converting the remaining PDFs here: {e}")
+            self.pool.close()
+            if self.stats is not None:
+                self.stats.file_finished()
+            for pdf_file in pdf_files:
+                if os.path.exists(pdf_file) and not self.process_pdf(pdf_file):
+                    logging.error(f"Failed to process PDF: {pdf_file}")
+            return
+        if self.stats is not None:
+            self.stats.file_finished()
+
     def move_folder(self, src_folder, dest_folder):
         """Move folder and merge if destination exists."""
         if not os.path.exists(dest_folder):
-            shutil.move(src_folder, dest_folder)
+            self.governor.move(src_folder, dest_folder)
             logging.info(f"Folder moved: {src_folder} -> {dest_folder}")
         else:
             for root, _, files in os.walk(src_folder):
@@ -103,52 +211,127 @@ class PDFHandler(FileSystemEventHandler):
                     dest_file = os.path.join(target_folder, file)
                     if os.path.exists(dest_file):
                         dest_file = os.path.join(target_folder, f"conflict_{file}")
-                    shutil.move(src_file, dest_file)
+                    self.governor.move(src_file, dest_file)
                     logging.info(f"File moved: {src_file} -> {dest_file}")
             shutil.rmtree(src_folder)
             logging.info(f"Source folder cleaned: {src_folder}")
 
     def process_pdf(self, pdf_file):
         """Converts each page of the PDF to a JPEG file with retries and removes the original PDF."""
-        for attempt in range(self.max_retries):
+        if self.stats is not None:
+            self.stats.file_started(pdf_file)
+        settings = self.settings  # Settings changed while converting apply from the next file
+        waited = self.governor.waited
+        started = time.perf_counter()
+        with tracing.span("process_pdf", file=pdf_file):
+            result = self.convert_pdf(pdf_file, settings)
+        if self.governor.waited - waited >= 0.1:
+            logging.info(f"Waited {self.governor.waited - waited:.1f}s for the I/O governor writing pages of {pdf_file}")
+        if self.folder_manifest is not None:
+            self.folder_manifest.add_source(pdf_file, result, settings, time.perf_counter() - started)
+        if self.stats is not None:
+            self.stats.file_finished()
+        if self.profiling is not None:
+            self.profiling.file_done()
+        return result
+
+    def convert_pdf(self, pdf_file, settings):
+        """Retry loop of process_pdf."""
+        max_retries = settings["max_retries"]
+        adaptive_dpi = settings["dpi_mode"] == "adaptive"
+        force_gray = settings["output_mode"] == "gray"
+        gray_tolerance = settings["gray_tolerance"]
+        blank_pages_mode = settings["blank_pages"]
+        for attempt in range(max_retries):
             try:
                 # Ensure file stability before opening
-                if not self.wait_for_file_stability(pdf_file, 10):
-                    logging.warning(f"File not stable: {pdf_file}")
-                    return
+                if self.check_stability:
+                    with tracing.span("stability_wait"):
+                        stable = self.wait_for_file_stability(pdf_file, 10)
+                    if not stable:
+                        logging.warning(f"File not stable: {pdf_file}")
+                        return
 
                 if not os.path.exists(pdf_file):
                     logging.warning(f"File no longer exists: {pdf_file}. Skipping.")
                     return
 
-                doc = fitz.open(pdf_file)
-                total_pages = len(doc)
-                page_digits = len(str(total_pages))
-                logging.info(f"Processing {total_pages} pages in PDF: {pdf_file}")
-
-                for page_num in range(total_pages):
-                    try:
-                        page = doc[page_num]
-                        pix = page.get_pixmap(dpi=200)  # Set 200 DPI for the Pixmap
-
-                        # Convert Pixmap to Pillow Image for RGB conversion
-                        img = Image.open(io.BytesIO(pix.tobytes("ppm")))
-                        if img.mode != "RGB":
-                            img = img.convert("RGB")  # Ensure 24-bit RGB
-
-                        # Save as JPEG with Pillow, setting quality and DPI
-                        output_jpeg = os.path.join(
-                            os.path.dirname(pdf_file),
-                            f"{os.path.splitext(os.path.basename(pdf_file))[0]}_page_{str(page_num + 1).zfill(page_digits)}.jpg"
-                        )
-                        img.save(output_jpeg, "JPEG", quality=60, dpi=(200, 200))
-                        logging.info(f"Saved JPEG: {output_jpeg}")
-
-                    except Exception as e:
-                        logging.error(f"Error processing page {page_num + 1} of {pdf_file}: {e}")
-                        continue
-
-                doc.close()
+                with pdf_loader.open_pdf(pdf_file) as doc:
+                    total_pages = len(doc)
+                    small_job = total_pages <= io_governor.SMALL_JOB_PAGES  # Gets priority on throttled writes
+                    page_digits = len(str(total_pages))
+                    logging.info(f"Processing {total_pages} pages in PDF: {pdf_file}")
+                    blank_pages = []
+
+                    for page_num in range(total_pages):
+                        page_start = time.perf_counter()
+                        try:
+                            page = doc[page_num]
+
+                            # Classify on a low-resolution preview before paying for the full render
+                            preview = None
+                            if (gray_tolerance and not force_gray) or blank_pages_mode != "off":
+                                with tracing.span("preview", page=page_num + 1):
+                                    preview = page_analysis.render_preview(page)
+
+                            if blank_pages_mode != "off" and page_analysis.ink_coverage(preview) <= settings["blank_threshold"]:
+                                blank_pages.append(page_num + 1)
+                                if blank_pages_mode == "skip":
+                                    logging.info(f"Skipped blank page {page_num + 1} of {pdf_file}", extra={
+                                        "per_page": True, "file": pdf_file, "page": page_num + 1
+                                    })
+                                    continue
+
+                            # Scanned pages are rendered at no more than their scan resolution
+                            dpi = settings["dpi"]
+                            if adaptive_dpi:
+                                dpi = page_analysis.render_dpi(page, settings["min_dpi"], dpi)
+
+                            # Gray pages are rendered and saved with one channel
+                            if force_gray or (gray_tolerance and page_analysis.is_grayscale(preview, gray_tolerance)):
+                                with tracing.span("get_pixmap", page=page_num + 1, colorspace="gray", dpi=dpi):
+                                    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+                                with tracing.span("convert", page=page_num + 1):
+                                    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)  # 8-bit grayscale
+                            else:
+                                with tracing.span("get_pixmap", page=page_num + 1, colorspace="rgb", dpi=dpi):
+                                    pix = page.get_pixmap(dpi=dpi)
+
+                                # Convert Pixmap to Pillow Image for RGB conversion
+                                with tracing.span("convert", page=page_num + 1):
+                                    img = Image.open(io.BytesIO(pix.tobytes("ppm")))
+                                    if img.mode != "RGB":
+                                        img = img.convert("RGB")  # Ensure 24-bit RGB
+
+                            # Save as JPEG with Pillow, setting quality and DPI
+                            output_jpeg = os.path.join(
+                                os.path.dirname(pdf_file),
+                                f"{os.path.splitext(os.path.basename(pdf_file))[0]}_page_{str(page_num + 1).zfill(page_digits)}.jpg"
+                            )
+                            with tracing.span("save", page=page_num + 1):
+                                data = self.governor.save_image(
+                                    img, output_jpeg, "JPEG", small_job, quality=settings["jpeg_quality"], dpi=(dpi, dpi)
+                                )
+                            duration_ms = round((time.perf_counter() - page_start) * 1000, 1)
+                            if self.folder_manifest is not None:
+                                self.folder_manifest.add_file(output_jpeg, pdf_file, page_num + 1, data, dpi=dpi, duration_ms=duration_ms)
+                            if self.stats is not None:
+                                self.stats.page_done()
+                            logging.info(f"Saved JPEG: {output_jpeg}", extra={
+                                "per_page": True, "file": pdf_file, "page": page_num + 1, "dpi": dpi,
+                                "duration_ms": duration_ms
+                            })
+
+                        except Exception as e:
+                            logging.error(f"Error processing page {page_num + 1} of {pdf_file}: {e}")
+                            continue
+
+                if blank_pages:
+                    action = "skipped" if blank_pages_mode == "skip" else "tagged"
+                    sidecar = page_analysis.write_blank_pages_sidecar(pdf_file, total_pages, blank_pages, action)
+                    logging.info(f"Blank pages {blank_pages} of {pdf_file} {action}, listed in {sidecar}")
+                    if self.folder_manifest is not None:
+                        self.folder_manifest.add_file(sidecar, pdf_file)
 
                 if os.path.exists(pdf_file):
                     os.remove(pdf_file)
@@ -157,41 +340,171 @@ class PDFHandler(FileSystemEventHandler):
                 return True  # Successfully processed PDF
 
             except Exception as e:
-                logging.error(f"Attempt {attempt + 1}/{self.max_retries} failed for {pdf_file}: {e}")
-                if attempt < self.max_retries - 1:
+                logging.error(f"Attempt {attempt + 1}/{max_retries} failed for {pdf_file}: {e}")
+                if attempt < max_retries - 1:
                     time.sleep(2)  # Wait before retrying
                 else:
-                    logging.error(f"Exceeded max retries ({self.max_retries}) for {pdf_file}")
+                    logging.error(f"Exceeded max retries ({max_retries}) for {pdf_file}")
 
         return False  # Return failure if max retries are exceeded
 
-if __name__ == "__main__":
-    args = parse_args()
+def handle_sigterm(signum, frame):
+    """Turns termination by JobManager into the KeyboardInterrupt shutdown path."""
+    raise KeyboardInterrupt
+
+# Handler used by batch worker processes, created once per worker
+batch_handler = None
+
+def init_batch_worker(log_queue, profile, page_log_every, trace_dir, settings, config_file=None, buffer_limit=None):
+    global batch_handler
+    log_setup.attach_queue(log_queue, profile, PROCESSOR, page_log_every)
+    if buffer_limit is not None:
+        pdf_loader.set_buffer_limit(buffer_limit)
+    if trace_dir:
+        tracing.configure(trace_dir, profile, PROCESSOR)
+    batch_handler = PDFHandler(None, settings, check_stability=False)
+    if config_file and profile:
+        batch_handler.governor.follow_config(config_file, profile)
+
+def process_batch_file(pdf_file, trace_id=None):
+    with tracing.trace("item", pdf_file, trace_id=trace_id):
+        return batch_handler.process_pdf(pdf_file)
+
+def process_folder_file(item):
+    """Converts one PDF of a watch-mode folder in a pool worker; returns (ok, pages saved, FolderManifest)."""
+    pdf_file, settings, trace_id, buffer_limit = item
+    pdf_loader.set_buffer_limit(buffer_limit)  # Share of the workers this folder runs with
+    batch_handler.settings = settings
+    batch_handler.governor.check_config()
+    batch_handler.stats = stats.PageCounter()
+    batch_handler.folder_manifest = manifest.FolderManifest()
+    try:
+        return bool(process_batch_file(pdf_file, trace_id)), batch_handler.stats.pages, batch_handler.folder_manifest
+    except Exception as e:
+        logging.error(f"Pool worker failed for {pdf_file}: {e}")
+        return False, batch_handler.stats.pages, batch_handler.folder_manifest
+
+def cli_settings(args):
+    """Render settings given on the command line."""
+    return dict(
+        render_settings.DEFAULTS, max_retries=10, gray_tolerance=args.gray_tolerance,
+        blank_pages=args.blank_pages, blank_threshold=args.blank_threshold
+    )
+
+def load_settings(args):
+    """Render settings from the command line, overridden by the profile's block in --config."""
+    if args.config and args.profile:
+        return render_settings.load(args.config, args.profile, cli_settings(args))
+    return cli_settings(args)
+
+def run_once(args, settings, log_queue):
+    """Converts existing PDFs in place with a worker pool and returns the exit code."""
+    files = batch.collect_inputs(args.inputs, args.file_list, INPUT_EXTENSIONS)
+    return batch.run_batch(
+        "jpeg", files, process_batch_file,
+        initializer=init_batch_worker,
+        initargs=(
+            log_queue, args.profile, args.page_log_every, args.trace_dir, settings, args.config,
+            pdf_loader.worker_buffer_limit(args.workers)
+        ),
+        workers=args.workers, journal_path=args.journal
+    )
+
+def run_watch(args, settings, log_listener):
+    """Watches the watch directory and processes new PDFs until interrupted."""
     watch_directory = args.watch_dir
     output_directory = args.output_dir
-    max_retries = 10  # Define maximum retries here
 
     if not os.path.exists(watch_directory):
         logging.error(f"Watch directory does not exist: {watch_directory}")
-        sys.exit()
+        return
 
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
         logging.info(f"Created output directory: {output_directory}")
 
-    # Pass max_retries to PDFHandler
-    event_handler = PDFHandler(output_directory, max_retries=max_retries)
+    leases = None
+    if args.shared:
+        leases = lease.LeaseManager(args.lease_dir or lease.default_lease_dir(watch_directory), args.lease_ttl, args.node_id)
+        leases.start()
+        logging.info(f"Sharing {watch_directory} with other hosts as {leases.node_id}")
+
+    event_handler = PDFHandler(output_directory, settings, watch_directory=watch_directory, leases=leases)
+
+    # Folders are converted by worker processes when the render settings ask for more than one
+    pool_log_queue, pool_log_forwarder = log_setup.forward_process_queue(log_listener, batch.FolderPool.context)
+    event_handler.pool = batch.FolderPool(
+        init_batch_worker, (pool_log_queue, args.profile, args.page_log_every, args.trace_dir, settings, args.config)
+    )
+    watcher = None
+    if args.config and args.profile:
+        watcher = render_settings.SettingsWatcher(args.config, args.profile, cli_settings(args), settings)
+        watcher.check()
+        event_handler.governor.follow_config(args.config, args.profile)
     observer = Observer()
     observer.schedule(event_handler, watch_directory, recursive=True)
     observer.start()
     logging.info("Observer started...")
 
+    # Profiling on demand via SIGUSR1 (POSIX) or a control file in the watch folder
+    profile_name = f"{args.profile}_{PROCESSOR}" if args.profile else PROCESSOR
+    event_handler.profiling = profiling.ProfilingController(args.log_dir, profile_name, watch_directory)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, event_handler.profiling.handle_signal)
+
+    # Live backlog and throughput for the dashboard in the GUI
+    if args.stats_port:
+        event_handler.stats = stats.StatsReporter(
+            args.stats_port, args.profile, PROCESSOR, watch_directory, INPUT_EXTENSIONS, event_handler.governor
+        )
+        event_handler.stats.start()
+
+    # Items left by other hosts are swept in the background
+    if leases is not None:
+        event_handler.claims.start_sweeping(args.lease_ttl)
+
     try:
         while True:
-            time.sleep(10)
+            event_handler.profiling.check()
+            event_handler.governor.check_config()
+            if watcher is not None:
+                new_settings = watcher.check()
+                if new_settings is not None:
+                    event_handler.settings = new_settings
+            time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
         logging.info("Observer stopped.")
     observer.join()
+    event_handler.claims.stop()
+    event_handler.pool.close()
+    event_handler.governor.close()
+    pool_log_forwarder.stop()
+    event_handler.profiling.close()
+    if event_handler.stats is not None:
+        event_handler.stats.stop()
+    if leases is not None:
+        leases.stop()
     logging.info("Observer joined and exiting.")
 
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    args = parse_args()
+
+    # Batch workers log through a multiprocessing queue into this process's listener
+    log_queue = multiprocessing.Queue(-1) if args.once else None
+    log_listener = log_setup.configure_logging(
+        log_setup.log_file_path(args.log_dir, args.profile, PROCESSOR),
+        profile=args.profile, processor=PROCESSOR, page_log_every=args.page_log_every, log_queue=log_queue
+    )
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    if args.trace_dir:
+        tracing.configure(args.trace_dir, args.profile, PROCESSOR)
+
+    try:
+        settings = load_settings(args)
+        if args.once:
+            sys.exit(run_once(args, settings, log_queue))
+        run_watch(args, settings, log_listener)
+    finally:
+        log_listener.stop()
@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import socket
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+import tracing
+
+class LeaseManager:
+    """Cooperative claiming of input items by several hosts sharing one network folder.
+
+    Each claimed item gets a lease file in lease_dir, created atomically with
+    O_EXCL, holding the owner and an expiry that a heartbeat thread keeps pushing
+    forward. A host skips items leased by a live peer and takes over leases whose
+    expiry has passed (the owner crashed or lost the share). Expiry uses wall-clock
+    time, so ttl must be much larger than the clock skew between hosts.
+    """
+
+    def __init__(self, lease_dir, ttl=120, node_id=None):
+        self.lease_dir = lease_dir
+        self.ttl = ttl
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.held = {}  # key -> lease file path
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.heartbeat_thread = None
+        os.makedirs(lease_dir, exist_ok=True)
+
+    def lease_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.lease_dir, f"{digest}.lease")
+
+    def lease_record(self, key):
+        now = time.time()
+        return {"key": key, "owner": self.node_id, "heartbeat": now, "expires": now + self.ttl}
+
+    def read_lease(self, path):
+        """Returns the lease record, or a placeholder based on mtime while a peer is still writing it."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError:
+            try:
+                return {"owner": None, "expires": os.path.getmtime(path) + self.ttl}
+            except OSError:
+                return None
+        except OSError:
+            return None
+
+    def create(self, key, path):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.lease_record(key), f)
+        return True
+
+    def take_over(self, key, path, lease):
+        """Moves an expired lease aside with an atomic rename, then claims the item."""
+        stale_path = f"{path}.{self.node_id.replace(':', '_')}.stale"
+        try:
+            os.replace(path, stale_path)
+        except OSError:
+            return False  # A peer moved it first
+        moved = self.read_lease(stale_path)
+        if moved is not None and moved.get("expires", 0) > time.time():
+            # A peer renewed or re-created the lease between our read and the rename; give it back
+            try:
+                os.link(stale_path, path)
+            except OSError:
+                pass
+            os.remove(stale_path)
+            return False
+        os.remove(stale_path)
+        logging.info(f"Taking over expired lease on {key} from {lease.get('owner')}")
+        return self.create(key, path)
+
+    def acquire(self, key):
+        """Claims an item; returns False when it is already held here or by a live peer."""
+        path = self.lease_path(key)
+        with self.lock:
+            if key in self.held:
+                return False
+        if not self.create(key, path):
+            lease = self.read_lease(path)
+            if lease is None:
+                # Released between our create and read, try once more
+                if not self.create(key, path):
+                    return False
+            elif lease.get("expires", 0) > time.time():
+                return False
+            elif not self.take_over(key, path, lease):
+                return False
+        with self.lock:
+            self.held[key] = path
+        return True
+
+    def release(self, key):
+        with self.lock:
+            path = self.held.pop(key, None)
+        if path is None:
+            return
+        lease = self.read_lease(path)
+        if lease is not None and lease.get("owner") == self.node_id:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"Failed to remove lease for {key}: {e}")
+
+    @contextmanager
+    def claim(self, key):
+        """Context manager yielding whether the item was claimed; releases it on exit."""
+        claimed = self.acquire(key)
+        try:
+            yield claimed
+        finally:
+            if claimed:
+                self.release(key)
+
+    def renew_all(self):
+        with self.lock:
+            held = list(self.held.items())
+        for key, path in held:
+            lease = self.read_lease(path)
+            if lease is None or lease.get("owner") != self.node_id:
+                logging.warning(f"Lost lease on {key} to {lease.get('owner') if lease else 'nobody'}")
+                with self.lock:
+                    self.held.pop(key, None)
+                continue
+            tmp_path = f"{path}.{self.node_id.replace(':', '_')}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.lease_record(key), f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logging.warning(f"Failed to renew lease on {key}: {e}")
+
+    def heartbeat(self):
+        while not self.stop_event.wait(self.ttl / 3):
+            self.renew_all()
+
+    def start(self):
+        self.heartbeat_thread = threading.Thread(target=self.heartbeat, name="lease-heartbeat", daemon=True)
+        self.heartbeat_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.heartbeat_thread is not None:
+            self.heartbeat_thread.join()
+        with self.lock:
+            keys = list(self.held)
+        for key in keys:
+            self.release(key)
+
+def default_lease_dir(watch_dir):
+    """Lease folder next to the watch folder, so the observer never sees lease files."""
+    watch_dir = os.path.abspath(watch_dir)
+    return os.path.join(os.path.dirname(watch_dir), ".leases", os.path.basename(watch_dir))
+
+def item_key(watch_dir, path):
+    """Top-level entry of the watch folder that a path belongs to."""
+    relative_path = os.path.relpath(os.path.abspath(path), os.path.abspath(watch_dir))
+    return relative_path.split(os.sep)[0]
+
+class WatchFolderClaims:
+    """Hands new items of a watch folder to a processor's handle_path, one at a time.
+
+    With a LeaseManager each top-level item is claimed first and skipped while a
+    peer holds it; a sweep thread then picks up items that peers left behind.
+    Files whose names don't end in one of extensions are never swept, so outputs
+    written next to the inputs aren't claimed.
+    """
+
+    def __init__(self, watch_dir, handle_path, extensions, leases=None, ignore=()):
+        self.watch_dir = watch_dir
+        self.handle_path = handle_path  # Called as handle_path(path, is_directory)
+        self.extensions = tuple(extensions)
+        self.leases = leases
+        self.ignore = set(ignore)  # Names handled elsewhere, e.g. the profiling control file
+        self.lock = threading.Lock()  # Serializes observer events and sweeps
+        self.leftovers = {}  # Items a sweep processed that are still present, by name -> mtime
+        self.stop_event = threading.Event()
+        self.sweeper = None
+
+    def claim_and_handle(self, path, is_directory):
+        """Processes a new file or folder; returns False when another host holds its lease."""
+        if os.path.basename(path) in self.ignore:
+            return True
+        with tracing.trace("item", path):
+            detected = tracing.now_us()
+            with self.lock:
+                tracing.record("queued", detected)
+                if self.leases is None:
+                    self.handle_path(path, is_directory)
+                    return True
+                with self.leases.claim(item_key(self.watch_dir, path)) as claimed:
+                    if not claimed:
+                        logging.info(f"Skipping {path}: claimed by another processor")
+                        return False
+                    self.handle_path(path, is_directory)
+                    return True
+
+    def sweep(self):
+        """Claims unprocessed items left in the watch folder, e.g. by a host whose lease expired."""
+        try:
+            entries = list(os.scandir(self.watch_dir))
+        except OSError as e:
+            logging.warning(f"Failed to scan {self.watch_dir}: {e}")
+            return
+        for entry in entries:
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            if self.leftovers.get(entry.name) == mtime:
+                continue  # Already failed here and unchanged since
+            if not entry.is_dir() and not entry.name.lower().endswith(self.extensions):
+                continue  # Outputs and sidecars of files converted in place
+            if entry.name in self.ignore:
+                continue
+            if self.claim_and_handle(entry.path, entry.is_dir()) and os.path.exists(entry.path):
+                self.leftovers[entry.name] = mtime
+
+    def sweep_loop(self, interval):
+        """Sweeps the watch folder every interval seconds until stop() is called."""
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logging.error(f"Sweep of {self.watch_dir} failed: {e}")
+            if self.stop_event.wait(interval):
+                return
+
+    def start_sweeping(self, interval):
+        """Runs sweep_loop in its own thread, a sweep can take as long as converting what it finds."""
+        self.sweeper = threading.Thread(target=self.sweep_loop, args=(interval,), name="lease-sweep", daemon=True)
+        self.sweeper.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.sweeper is not None:
+            self.sweeper.join()
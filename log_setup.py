@@ -0,0 +1,119 @@
+import os
+import json
+import queue
+import multiprocessing
+import logging
+import logging.handlers
+
+# Size-based rotation of processor logs
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Structured fields copied from a record's extra={...} into the JSON line
+RECORD_FIELDS = ("profile", "processor", "file", "page", "dpi", "duration_ms")
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for field in RECORD_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class ContextFilter(logging.Filter):
+    """Stamps every record with the profile and processor this process works for."""
+
+    def __init__(self, profile=None, processor=None):
+        super().__init__()
+        self.profile = profile
+        self.processor = processor
+
+    def filter(self, record):
+        record.profile = self.profile
+        record.processor = self.processor
+        return True
+
+class PageSampler(logging.Filter):
+    """Passes only every Nth per-page record (logged with extra={"per_page": True}).
+
+    Warnings and errors always pass, so sampling never hides a failed page.
+    """
+
+    def __init__(self, every=1):
+        super().__init__()
+        self.every = max(int(every), 1)
+        self.count = 0
+
+    def filter(self, record):
+        if self.every == 1 or record.levelno > logging.INFO or not getattr(record, "per_page", False):
+            return True
+        self.count += 1
+        return self.count % self.every == 1
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for an in-process queue: records are handed over as they are.
+
+    QueueHandler.prepare() formats and copies every record so it can be pickled;
+    the listener thread of the same process doesn't need that.
+    """
+
+    def prepare(self, record):
+        return record
+
+def log_file_path(log_dir, profile, processor):
+    """Log file for a processor, prefixed with the profile when one is given."""
+    name = f"{profile}_{processor}.log" if profile else f"{processor}.log"
+    return os.path.join(log_dir or ".", name)
+
+def attach_queue(log_queue, profile=None, processor=None, page_log_every=1):
+    """Routes this process's logging into log_queue; the caller only pays for a queue put."""
+    if isinstance(log_queue, (queue.Queue, queue.SimpleQueue)):
+        handler = LocalQueueHandler(log_queue)
+    else:
+        handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(ContextFilter(profile, processor))
+    handler.addFilter(PageSampler(page_log_every))
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+def configure_logging(log_file, profile=None, processor=None, page_log_every=1, log_queue=None):
+    """Sets up JSON logging to a size-rotated file, written by a background QueueListener.
+
+    Pass a multiprocessing queue as log_queue when worker processes log through
+    attach_queue(); the returned listener must be stopped on exit to flush it.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = log_queue if log_queue is not None else queue.SimpleQueue()
+    attach_queue(log_queue, profile, processor, page_log_every)
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+def forward_process_queue(listener, context=multiprocessing):
+    """Returns a queue for worker processes of context whose records go to listener's handlers.
+
+    Workers attach with attach_queue(), which already stamps and samples their
+    records, so they bypass this process's own queue handler. Stop the returned
+    forwarder on exit.
+    """
+    process_queue = context.Queue(-1)
+    forwarder = logging.handlers.QueueListener(process_queue, *listener.handlers, respect_handler_level=True)
+    forwarder.start()
+    return process_queue, forwarder
@@ -1,11 +1,15 @@
 import multiprocessing
 import subprocess
+import json
 import os
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QPushButton, QListWidget, QVBoxLayout, QWidget, QLabel, QInputDialog, QSpacerItem, QSizePolicy, QSystemTrayIcon, QMenu, QAction, qApp, QDialog, QLineEdit, QSpinBox, QDialogButtonBox, QMenuBar, QMessageBox, QDesktopWidget
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QPushButton, QListWidget, QVBoxLayout, QWidget, QLabel, QInputDialog, QSpacerItem, QSizePolicy, QSystemTrayIcon, QMenu, QAction, qApp, QDialog, QLineEdit, QSpinBox, QDialogButtonBox, QMenuBar, QMessageBox, QDesktopWidget, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtNetwork import QUdpSocket, QHostAddress
 from PyQt5.QtGui import QFont, QIcon, QCursor
 from job_manager import JobManager
+import batch
+import stats
 from time import sleep
 import time
 
@@ -33,22 +37,10 @@ class JobQueueManager(QThread):
     def start_job(self, profile, processor_name, watch_dir, output_dir):
         """Start a job and keep track of the process."""
         try:
-            # Determine if running as an executable
-            if getattr(sys, 'frozen', False):
-                # Use the .exe if running as a frozen app
-                exe_dir = os.path.dirname(sys.executable)
-                # Force replacement of .py with .exe
-                if processor_name.endswith('.py'):
-                    processor_name = os.path.splitext(processor_name)[0] + '.exe'
-                processor_path = os.path.join(exe_dir, processor_name)
-            else:
-                # Use the .py directly if running as a script
-                processor_path = processor_name
-
             # Start the processor as a daemon process (no terminal window)
             process = subprocess.Popen(
-                [processor_path, '--watch-dir', watch_dir, '--output-dir', output_dir],
-                creationflags=subprocess.CREATE_NO_WINDOW
+                self.manager.processor_command(processor_name, watch_dir, output_dir, profile),
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
             )
 
             # Store the process so it can be terminated later
@@ -129,6 +121,88 @@ class ProfileNameDialog(QDialog):
     def get_value(self):
         return self.profile_input.text()
 
+class DashboardWindow(QDialog):
+    """Live backlog and throughput per profile, fed by the stats datagrams of the processors."""
+
+    COLUMNS = ("Profile", "Status", "Pending Files", "Pending Pages", "Pages/Min", "Oldest Waiting", "Busy Workers", "I/O Wait s/Min", "ETA")
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Dashboard")
+        self.resize(900, 400)
+        self.manager = manager
+        self.reports = {}  # (profile, processor) -> latest stats report
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel(self)
+        self.summary_label.setStyleSheet("color: black;")
+        layout.addWidget(self.summary_label)
+
+        self.table = QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        # Processors push a datagram every few seconds; datagrams are only stored on arrival
+        self.socket = QUdpSocket(self)
+        port = self.manager.get_stats_port()
+        if port and not self.socket.bind(QHostAddress.LocalHost, port):
+            self.summary_label.setText(f"Cannot listen for stats on port {port}: {self.socket.errorString()}")
+        self.socket.readyRead.connect(self.read_datagrams)
+
+        # The table is redrawn on a timer, so the GUI cost doesn't grow with the datagram rate
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+
+    def read_datagrams(self):
+        while self.socket.hasPendingDatagrams():
+            data = bytes(self.socket.receiveDatagram().data())
+            try:
+                report = json.loads(data)
+                self.reports[(report["profile"], report["processor"])] = report
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        profiles = self.manager.get_profiles_with_status()
+        by_profile = {}
+        for (profile, _), report in self.reports.items():
+            by_profile.setdefault(profile, []).append(report)
+
+        now = time.time()
+        core_cap = self.manager.get_core_cap()
+        total_busy = 0
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(profiles))
+        for row, (profile, details) in enumerate(sorted(profiles.items())):
+            summary = stats.summarize_profile(by_profile.get(profile, []), now)
+            total_busy += summary["busy"]
+            status = details['status'] if summary["processors"] else f"{details['status']} (no data)"
+            if summary["eta"] is not None:
+                eta = batch.format_duration(summary["eta"])
+            else:
+                eta = "stalled" if summary["pending_pages"] else "-"
+            oldest = batch.format_duration(summary["oldest_age"]) if summary["oldest_age"] is not None else "-"
+            values = (
+                profile, status, summary["pending_files"], summary["pending_pages"],
+                f"{summary['pages_per_minute']:.1f}", oldest, f"{summary['busy']} / {summary['processors']}",
+                f"{summary['io_wait_per_minute']:.1f}", eta
+            )
+            for column, value in enumerate(values):
+                item = self.table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.table.setItem(row, column, item)
+                item.setText(str(value))
+        self.table.setUpdatesEnabled(True)
+        if self.socket.state() == QUdpSocket.BoundState:
+            self.summary_label.setText(f"Busy workers: {total_busy} of core cap {core_cap}")
+
 class MainUI(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -141,6 +215,8 @@ class MainUI(QMainWindow):
         self.manager = JobManager(CONFIG_FILE)
         self.network_folder = self.manager.config.get('network_folder', '')
 
+        self.dashboard = DashboardWindow(self.manager, self)
+
         self.init_tray()
         self.init_ui()
         self.init_menu()
@@ -179,11 +255,14 @@ class MainUI(QMainWindow):
             self.tray_menu.addAction(profile_action)
 
         show_action = QAction("Show", self)
+        dashboard_action = QAction("Dashboard", self)
         quit_action = QAction("Quit", self)
         show_action.triggered.connect(self.show)
+        dashboard_action.triggered.connect(self.show_dashboard)
         quit_action.triggered.connect(self.confirm_quit)
         self.tray_menu.addSeparator()
         self.tray_menu.addAction(show_action)
+        self.tray_menu.addAction(dashboard_action)
         self.tray_menu.addAction(quit_action)
 
     def init_ui(self):
@@ -261,6 +340,10 @@ class MainUI(QMainWindow):
         layout.addWidget(toggle_status_btn)
         toggle_status_btn.clicked.connect(self.toggle_job_status)
 
+        dashboard_btn = QPushButton("Show Dashboard", self)
+        layout.addWidget(dashboard_btn)
+        dashboard_btn.clicked.connect(self.show_dashboard)
+
         widget = QWidget()
         widget.setLayout(layout)
         self.setCentralWidget(widget)
@@ -362,6 +445,11 @@ class MainUI(QMainWindow):
             self.manager.toggle_profile_status(profile_name)
             self.load_profiles()
 
+    def show_dashboard(self):
+        self.dashboard.show()
+        self.dashboard.refresh()
+        self.dashboard.raise_()
+
     def set_core_cap(self):
         dialog = CoreCapDialog(self.core_cap, self.core_count, self)
         if dialog.exec_():
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+import io_governor
+
+# Written into every output folder once all of its files are in place
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Append-only list of completed folders in the output directory of a profile, one JSON object per line
+INDEX_NAME = "index.jsonl"
+
+# A reader holding the old manifest open on Windows blocks the replace for a moment
+REPLACE_RETRIES = 5
+
+def timestamp(seconds):
+    return datetime.fromtimestamp(seconds).astimezone().isoformat(timespec="seconds")
+
+def read_manifest(folder):
+    """Returns the manifest of a folder, None if it has none or it can't be read."""
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_atomic(path, data):
+    """Writes data to a temp file next to path and replaces path with it, so readers never see a partial file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    for attempt in range(REPLACE_RETRIES):
+        try:
+            os.replace(temp_path, path)
+            return
+        except PermissionError:
+            if attempt == REPLACE_RETRIES - 1:
+                raise
+            time.sleep(0.5)
+
+def append_index(directory, entry):
+    """Appends one line to the index of directory, locked against other processors appending to it."""
+    line = (json.dumps(entry) + "\n").encode("utf-8")
+    with open(os.path.join(directory, INDEX_NAME), 'ab') as f:
+        io_governor.lock_file(f)
+        try:
+            f.seek(0, os.SEEK_END)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            io_governor.unlock_file(f)
+
+class FolderManifest:
+    """Files produced for one output folder, published as manifest.json when the folder is complete.
+
+    Files are keyed by name, so a PDF converted again after a failed attempt
+    replaces the entries of that attempt. Folder pool workers fill their own
+    manifest per file and the watching process merges them with update().
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.files = {}  # Name -> source, page, size, sha256, dpi, duration_ms
+        self.sources = {}  # Name -> ok, seconds, render settings
+
+    def add_file(self, path, source, page=None, data=None, **details):
+        """Records a produced file; data is its content if at hand, otherwise the file is read back."""
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        self.files[os.path.basename(path)] = dict(
+            source=os.path.basename(source), page=page, size=len(data),
+            sha256=hashlib.sha256(data).hexdigest(), **details
+        )
+
+    def add_source(self, source, ok, settings, seconds):
+        self.sources[os.path.basename(source)] = {"ok": bool(ok), "seconds": round(seconds, 3), "settings": settings}
+
+    def update(self, other):
+        self.files.update(other.files)
+        self.sources.update(other.sources)
+
+    def publish(self, folder, index_directory, processor):
+        """Writes manifest.json into folder, then appends the folder to the index; returns the manifest.
+
+        Entries of an earlier manifest are kept for files that are still in the
+        folder, e.g. when a folder of the same name was merged into it.
+        """
+        names = set(os.listdir(folder))
+        files, sources = {}, {}
+        previous = read_manifest(folder)
+        if previous is not None:
+            files = {entry["file"]: entry for entry in previous.get("files", []) if entry.get("file") in names}
+            sources = {entry["file"]: entry for entry in previous.get("sources", [])}
+        files.update((name, dict(file=name, **entry)) for name, entry in self.files.items() if name in names)
+        sources.update((name, dict(file=name, **entry)) for name, entry in self.sources.items())
+
+        completed = time.time()
+        failed = sorted(name for name, entry in sources.items() if not entry["ok"])
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "folder": os.path.basename(folder),
+            "processor": processor,
+            "started": timestamp(self.started),
+            "completed": timestamp(completed),
+            "seconds": round(completed - self.started, 3),
+            "complete": not failed,
+            "failed": failed,
+            "files": sorted(files.values(), key=lambda entry: entry["file"]),
+            "sources": sorted(sources.values(), key=lambda entry: entry["file"]),
+            # Files in the folder the processor didn't produce, e.g. unsupported or failed inputs
+            "other_files": sorted(names - set(files) - {MANIFEST_NAME, f"{MANIFEST_NAME}.tmp"}),
+        }
+        write_atomic(os.path.join(folder, MANIFEST_NAME), json.dumps(manifest, indent=4).encode("utf-8"))
+        append_index(index_directory, {
+            "folder": manifest["folder"],
+            "manifest": f"{manifest['folder']}/{MANIFEST_NAME}",
+            "completed": manifest["completed"],
+            "complete": manifest["complete"],
+            "files": len(manifest["files"]),
+            "bytes": sum(entry["size"] for entry in manifest["files"]),
+        })
+        return manifest
@@ -0,0 +1,116 @@
+import os
+import json
+import math
+from PIL import Image, ImageChops
+
+# Resolution of the throwaway render used to classify a page before the full render
+PREVIEW_DPI = 24
+
+# Share of pixels allowed above the color tolerance (JPEG noise, colored specks)
+COLOR_PIXEL_RATIO = 0.001
+
+def render_preview(page, dpi=PREVIEW_DPI):
+    """Renders a small RGB preview of a PyMuPDF page as a Pillow image."""
+    pix = page.get_pixmap(dpi=dpi)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+def is_grayscale(img, tolerance):
+    """Returns True when (nearly) every pixel has R, G and B within tolerance of each other.
+
+    The channel spread is computed with Pillow's C image operations and counted
+    from a histogram, so no per-pixel Python code runs.
+    """
+    r, g, b = img.convert("RGB").split()
+    spread = ImageChops.lighter(
+        ImageChops.lighter(ImageChops.difference(r, g), ImageChops.difference(g, b)),
+        ImageChops.difference(r, b)
+    )
+    colored = sum(spread.histogram()[tolerance + 1:])
+    return colored <= COLOR_PIXEL_RATIO * img.width * img.height
+
+# Share of the page that embedded images must cover for it to count as a scanned page
+IMAGE_COVERAGE = 0.5
+
+def clipped_area(bbox, rect):
+    x0, y0 = max(bbox[0], rect[0]), max(bbox[1], rect[1])
+    x1, y1 = min(bbox[2], rect[2]), min(bbox[3], rect[3])
+    return max(x1 - x0, 0) * max(y1 - y0, 0)
+
+def source_dpi(page):
+    """Returns the effective resolution of the dominant image of a scanned page, None for other pages.
+
+    The resolution is the image's pixel count over the area it is drawn on, so
+    it doesn't depend on the image being rotated by 90 degrees.
+    """
+    page_rect = tuple(page.rect)
+    page_area = clipped_area(page_rect, page_rect)
+    images = [
+        (clipped_area(info["bbox"], page_rect), info)
+        for info in page.get_image_info()
+        if info["width"] and info["height"]
+    ]
+    if not images or sum(area for area, _ in images) < IMAGE_COVERAGE * page_area:
+        return None  # Text, vector drawings or small pictures need the full resolution
+    _, dominant = max(images, key=lambda image: image[0])
+    drawn_area = clipped_area(dominant["bbox"], dominant["bbox"])
+    if not drawn_area:
+        return None
+    return 72 * math.sqrt(dominant["width"] * dominant["height"] / drawn_area)
+
+def render_dpi(page, min_dpi, max_dpi):
+    """Chooses a render resolution no higher than the page's scan detail, within min_dpi and max_dpi.
+
+    A min_dpi above max_dpi is capped at max_dpi, so low fixed resolutions keep working in adaptive mode.
+    """
+    detail = source_dpi(page)
+    if detail is None:
+        return max_dpi
+    return max(min(min_dpi, max_dpi), min(max_dpi, round(detail)))
+
+# Gray level below which a preview pixel counts as ink; previews blur thin strokes to mid-gray
+INK_LEVEL = 200
+
+# Share of each edge ignored when measuring ink (scanner borders, punch holes, shadows)
+BLANK_MARGIN = 0.05
+
+def ink_coverage(img, ink_level=INK_LEVEL, margin=BLANK_MARGIN):
+    """Returns the share of pixels inside the margins that are darker than ink_level."""
+    gray = img.convert("L")
+    dx, dy = int(gray.width * margin), int(gray.height * margin)
+    gray = gray.crop((dx, dy, gray.width - dx, gray.height - dy))
+    return sum(gray.histogram()[:ink_level]) / max(gray.width * gray.height, 1)
+
+def otsu_threshold(gray):
+    """Returns the gray level that best separates ink from paper (Otsu's method) in an "L" image."""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    best_level, best_variance = 128, -1.0
+    dark = weighted_dark = 0  # Pixels at or below the candidate level
+    for level, count in enumerate(histogram):
+        dark += count
+        if dark == 0:
+            continue
+        light = total - dark
+        if light == 0:
+            break
+        weighted_dark += level * count
+        variance = dark * light * (weighted_dark / dark - (weighted_total - weighted_dark) / light) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level + 1, variance
+    return best_level
+
+def write_blank_pages_sidecar(pdf_file, total_pages, blank_pages, action):
+    """Records which pages were detected as blank next to the page images of pdf_file."""
+    sidecar = os.path.join(
+        os.path.dirname(pdf_file),
+        f"{os.path.splitext(os.path.basename(pdf_file))[0]}_blank_pages.json"
+    )
+    with open(sidecar, 'w') as f:
+        json.dump({
+            "source": os.path.basename(pdf_file),
+            "total_pages": total_pages,
+            "blank_pages": blank_pages,
+            "action": action
+        }, f, indent=4)
+    return sidecar
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+import fitz  # PyMuPDF
+import tracing
+
+# PDFs up to this size are read into memory with one sequential read
+IN_MEMORY_THRESHOLD = 64 * 1024 * 1024
+
+# Upper bound for PDF bytes held in memory at once by all processes converting in parallel
+MAX_BUFFERED_BYTES = 256 * 1024 * 1024
+
+# Copy buffer for staging large PDFs to local disk
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+STAGING_DIR = os.path.join(tempfile.gettempdir(), "file_processor_staging")
+
+class BufferBudget:
+    """Tracks how many PDF bytes are buffered in memory so the total stays capped."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def try_reserve(self, size):
+        with self.lock:
+            if self.used + size > self.limit:
+                return False
+            self.used += size
+            return True
+
+    def release(self, size):
+        with self.lock:
+            self.used -= size
+
+budget = BufferBudget(MAX_BUFFERED_BYTES)
+
+def worker_buffer_limit(workers):
+    """Share of MAX_BUFFERED_BYTES for each of workers processes converting in parallel."""
+    return MAX_BUFFERED_BYTES // max(workers, 1)
+
+def set_buffer_limit(limit):
+    """Sets how many PDF bytes this process may hold in memory, e.g. to its worker_buffer_limit()."""
+    with budget.lock:
+        budget.limit = limit
+
+def read_file(path, size):
+    """Reads the whole file with one large sequential read."""
+    data = bytearray(size)
+    with open(path, 'rb', buffering=0) as f:
+        view = memoryview(data)
+        read = 0
+        while read < size:
+            n = f.readinto(view[read:])
+            if not n:
+                break
+            read += n
+    return data if read == size else data[:read]
+
+def stage_file(path):
+    """Copies the file to local disk with large sequential reads and returns the copy's path."""
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    fd, staged_path = tempfile.mkstemp(suffix=".pdf", dir=STAGING_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as dst, open(path, 'rb', buffering=0) as src:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+    except BaseException:
+        os.remove(staged_path)  # A partial copy would be left behind by every retry
+        raise
+    return staged_path
+
+@contextmanager
+def open_pdf(path):
+    """Opens a PDF without letting MuPDF issue small random reads against the (network) file.
+
+    Small files are read into memory in one go and opened from the buffer while the
+    process's buffered total stays under its budget. Larger files, or files that don't
+    fit the budget, are copied to a local staging file, which the OS page cache maps
+    for MuPDF; the copy is removed on exit. Worker processes get an equal share of
+    MAX_BUFFERED_BYTES through set_buffer_limit(), so all of them together stay
+    under it.
+    """
+    size = os.path.getsize(path)
+    if size <= IN_MEMORY_THRESHOLD and budget.try_reserve(size):
+        try:
+            with tracing.span("fitz.open", mode="memory", bytes=size):
+                doc = fitz.open(stream=read_file(path, size), filetype="pdf")
+            try:
+                yield doc
+            finally:
+                doc.close()
+        finally:
+            budget.release(size)
+        return
+
+    staged_path = None
+    try:
+        with tracing.span("fitz.open", mode="staged", bytes=size):
+            staged_path = stage_file(path)
+            doc = fitz.open(staged_path)
+        try:
+            yield doc
+        finally:
+            doc.close()
+    finally:
+        if staged_path is not None:
+            try:
+                os.remove(staged_path)
+            except OSError as e:
+                logging.warning(f"Failed to remove staged copy {staged_path}: {e}")
@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+
+# Name of the file that requests a profiling session when dropped into a watch folder
+CONTROL_FILE = ".profile-request"
+
+# Defaults for a session started without explicit limits
+DEFAULT_SECONDS = 60
+SAMPLE_INTERVAL = 0.005
+TOP_ENTRIES = 40
+
+class SamplingProfiler:
+    """Samples the stacks of every thread from a background thread.
+
+    Unlike cProfile, which only sees the thread that enabled it, this covers the
+    observer thread doing the conversions and can be started and stopped from
+    any thread.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.own_stacks = Counter()  # Innermost function -> samples
+        self.cumulative = Counter()  # Any function on the stack -> samples
+        self.folded = Counter()  # Whole stack "a;b;c" -> samples, for flame graphs
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if not stack:
+                continue
+            self.own_stacks[stack[0]] += 1
+            for function in set(stack):
+                self.cumulative[function] += 1
+            self.folded[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def write(self, path_prefix):
+        with open(f"{path_prefix}.txt", "w", encoding="utf-8") as f:
+            f.write(f"{self.samples} samples every {self.interval * 1000:.0f} ms across all threads\n\n")
+            f.write("Top functions by own samples:\n")
+            for function, count in self.own_stacks.most_common(TOP_ENTRIES):
+                f.write(f"{count:8d}  {function}\n")
+            f.write("\nTop functions by cumulative samples:\n")
+            for function, count in self.cumulative.most_common(TOP_ENTRIES):
+                f.write(f"{count:8d}  {function}\n")
+        with open(f"{path_prefix}.folded", "w", encoding="utf-8") as f:
+            for stack, count in self.folded.most_common():
+                f.write(f"{stack} {count}\n")
+
+class ProfilingController:
+    """Runs on-demand profiling sessions (stack sampling plus tracemalloc) in a processor.
+
+    A session is requested by signal (SIGUSR1, 60 seconds) or by a control file in
+    the watch folder holding {"seconds": N} or {"files": N}. Nothing is sampled or
+    traced until a session starts. Results are written to output_dir as
+    <name>_profile_<time>.txt/.folded and <name>_alloc_<time>.txt.
+    """
+
+    def __init__(self, output_dir, name, watch_dir=None):
+        self.output_dir = output_dir
+        self.name = name
+        self.watch_dir = watch_dir
+        self.lock = threading.Lock()
+        self.requested = None
+        self.profiler = None
+        self.deadline = None
+        self.files_left = None
+
+    def request(self, seconds=None, files=None):
+        """Asks for a session; safe to call from a signal handler."""
+        self.requested = (seconds, files)
+
+    def handle_signal(self, signum, frame):
+        self.request(seconds=DEFAULT_SECONDS)
+
+    def read_control_file(self):
+        if self.watch_dir is None:
+            return
+        path = os.path.join(self.watch_dir, CONTROL_FILE)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+            settings = json.loads(text) if text else {}
+            os.remove(path)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring profiling request {path}: {e}")
+            return
+        self.request(seconds=settings.get("seconds"), files=settings.get("files"))
+
+    def start(self, seconds, files):
+        if seconds is None and files is None:
+            seconds = DEFAULT_SECONDS
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.files_left = files
+        tracemalloc.start(25)
+        self.profiler = SamplingProfiler()
+        self.profiler.start()
+        logging.info(f"Profiling started for {f'{seconds} seconds' if seconds else f'{files} files'}")
+
+    def stop(self):
+        self.profiler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        prefix = os.path.join(self.output_dir, f"{self.name}_profile_{stamp}")
+        self.profiler.write(prefix)
+        alloc_path = os.path.join(self.output_dir, f"{self.name}_alloc_{stamp}.txt")
+        with open(alloc_path, "w", encoding="utf-8") as f:
+            f.write("Top allocation sites (live at the end of the session):\n")
+            for stat in snapshot.statistics("traceback")[:TOP_ENTRIES]:
+                f.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format():
+                    f.write(f"{line}\n")
+        logging.info(f"Profiling stopped, results in {prefix}.txt and {alloc_path}")
+        self.profiler = None
+        self.deadline = None
+        self.files_left = None
+
+    def check(self):
+        """Starts a requested session or ends a finished one; call periodically."""
+        self.read_control_file()
+        with self.lock:
+            if self.requested is not None and self.profiler is None:
+                seconds, files = self.requested
+                self.requested = None
+                self.start(seconds, files)
+            elif self.profiler is not None:
+                if (self.deadline is not None and time.monotonic() >= self.deadline) or self.files_left == 0:
+                    self.stop()
+
+    def file_done(self):
+        """Counts a processed file towards a session limited to N files."""
+        with self.lock:
+            if self.profiler is not None and self.files_left:
+                self.files_left -= 1
+                if self.files_left == 0:
+                    self.stop()
+
+    def close(self):
+        with self.lock:
+            if self.profiler is not None:
+                self.stop()
+
+def write_request(watch_dir, seconds=None, files=None):
+    """Asks the processor watching watch_dir to profile itself for N seconds or N files."""
+    request = {}
+    if seconds:
+        request["seconds"] = seconds
+    if files:
+        request["files"] = files
+    with open(os.path.join(watch_dir, CONTROL_FILE), "w", encoding="utf-8") as f:
+        json.dump(request, f)
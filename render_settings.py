@@ -0,0 +1,113 @@
+import os
+import json
+import logging
+
+# Render settings of a profile, kept in a "render" block of its entry in config.json
+DEFAULTS = {
+    "dpi": 200,  # Render resolution, the upper bound in adaptive mode
+    "dpi_mode": "fixed",  # "adaptive" renders scanned pages at no more than their scan resolution
+    "min_dpi": 100,  # Lower bound in adaptive mode, capped at dpi
+    "jpeg_quality": 60,
+    "threshold": 128,  # Gray level below which a TIFF pixel turns black
+    "threshold_method": "fixed",  # "fixed" uses threshold, "otsu" picks one per page
+    "output_mode": "auto",  # "auto": colour JPEGs and 1-bit TIFFs, "gray": 8-bit grayscale for both
+    "workers": 1,  # Processes converting the files of a folder in parallel
+    "max_retries": 10,
+    "gray_tolerance": 0,
+    "blank_pages": "off",
+    "blank_threshold": 0.001,
+}
+
+CHOICES = {
+    "dpi_mode": ("fixed", "adaptive"),
+    "threshold_method": ("fixed", "otsu"),
+    "output_mode": ("auto", "gray"),
+    "blank_pages": ("off", "skip", "tag"),
+}
+
+RANGES = {
+    "dpi": (10, 1200),
+    "min_dpi": (10, 1200),
+    "jpeg_quality": (1, 95),
+    "threshold": (0, 255),
+    "workers": (1, 64),
+    "max_retries": (1, 100),
+    "gray_tolerance": (0, 255),
+    "blank_threshold": (0, 1),
+}
+
+# Profile keys that were written at the top level before the render block existed
+LEGACY_KEYS = ("gray_tolerance", "blank_pages", "blank_threshold")
+
+def validate(settings):
+    """Raises ValueError for unknown keys and invalid values; returns the settings."""
+    for key, value in settings.items():
+        if key not in DEFAULTS:
+            raise ValueError(f"Unknown render setting {key!r}")
+        if key in CHOICES:
+            if value not in CHOICES[key]:
+                raise ValueError(f"Render setting {key!r} must be one of {CHOICES[key]}, got {value!r}")
+            continue
+        expected = float if isinstance(DEFAULTS[key], float) else int
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or (expected is int and not isinstance(value, int)):
+            raise ValueError(f"Render setting {key!r} must be a number, got {value!r}")
+        low, high = RANGES[key]
+        if not low <= value <= high:
+            raise ValueError(f"Render setting {key!r} must be between {low} and {high}, got {value!r}")
+    return settings
+
+def profile_settings(profile, base=None):
+    """Settings for a profile entry: base (default: DEFAULTS) overlaid with the entry's settings."""
+    settings = dict(base or DEFAULTS)
+    for key in LEGACY_KEYS:
+        if key in profile:
+            settings[key] = profile[key]
+    settings.update(profile.get("render", {}))
+    return validate(settings)
+
+def load(config_file, profile_name, base=None):
+    """Reads the render settings of a profile from config.json."""
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+    profile = config.get("profiles", {}).get(profile_name)
+    if profile is None:
+        raise ValueError(f"Profile {profile_name!r} not found in {config_file}")
+    return profile_settings(profile, base)
+
+class SettingsWatcher:
+    """Reloads a profile's render settings when config.json changes.
+
+    A config that can't be read or holds invalid settings is logged once and
+    leaves the current settings in place until the file changes again.
+    """
+
+    def __init__(self, config_file, profile_name, base=None, settings=None):
+        self.config_file = config_file
+        self.profile_name = profile_name
+        self.base = base  # Settings the profile's block is laid over, e.g. from the command line
+        self.mtime = None
+        self.failed_mtime = None
+        self.settings = dict(settings or base or DEFAULTS)  # Settings in use, changes are logged against them
+
+    def check(self):
+        """Returns the new settings if they changed since the last call, otherwise None."""
+        try:
+            mtime = os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+        if mtime == self.mtime:
+            return None
+        try:
+            settings = load(self.config_file, self.profile_name, self.base)
+        except (OSError, ValueError) as e:
+            if mtime != self.failed_mtime:
+                logging.warning(f"Keeping current render settings, cannot load {self.config_file}: {e}")
+                self.failed_mtime = mtime
+            return None
+        self.mtime = mtime
+        if settings == self.settings:
+            return None
+        changes = {key: value for key, value in settings.items() if self.settings.get(key) != value}
+        self.settings = settings
+        logging.info(f"Render settings for profile {self.profile_name}: {changes}")
+        return settings
@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import signal
+import argparse
+import logging
+from job_manager import JobManager
+
+BASE_DIR = os.path.dirname(os.path.abspath(sys.executable)) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(BASE_DIR, 'config.json')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless File Processor service (no GUI)")
+    parser.add_argument('--config', default=CONFIG_FILE, help='Path to config.json')
+    parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between config and processor health checks')
+    return parser.parse_args()
+
+class HeadlessService:
+    """Supervises the processors of every active profile without loading PyQt.
+
+    Signals (POSIX):
+        SIGTERM/SIGINT  stop all processors and exit
+        SIGHUP          reload config.json immediately
+        SIGUSR1         pause: stop all processors, config is left untouched
+        SIGUSR2         unpause: start the processors of active profiles again
+    """
+
+    def __init__(self, config_file, poll_interval=5):
+        self.manager = JobManager(config_file)
+        self.poll_interval = poll_interval
+        self.config_mtime = self.get_config_mtime()
+        self.running = True
+        self.paused = False
+        self.reload_requested = False
+        self.wake = False
+
+    def get_config_mtime(self):
+        try:
+            return os.path.getmtime(self.manager.config_file)
+        except OSError:
+            return None
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        # SIGHUP/SIGUSR1/SIGUSR2 are not available on Windows
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.handle_reload)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self.handle_pause)
+        if hasattr(signal, 'SIGUSR2'):
+            signal.signal(signal.SIGUSR2, self.handle_unpause)
+
+    def handle_stop(self, signum, frame):
+        logging.info(f"Received signal {signum}, shutting down")
+        self.running = False
+
+    def handle_reload(self, signum, frame):
+        self.reload_requested = True
+        self.wake = True
+
+    def handle_pause(self, signum, frame):
+        self.paused = True
+        self.wake = True
+
+    def handle_unpause(self, signum, frame):
+        self.paused = False
+        self.wake = True
+
+    def reload_config(self):
+        """Re-read config.json, keeping the previous config if the file is mid-write."""
+        try:
+            self.manager.load_config()
+            logging.info(f"Reloaded config: {len(self.manager.get_profiles_with_status())} profiles")
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to reload config {self.manager.config_file}: {e}")
+        self.config_mtime = self.get_config_mtime()
+
+    def check(self):
+        """Apply pending reloads, pause state and restart exited processors."""
+        if self.reload_requested or self.get_config_mtime() != self.config_mtime:
+            self.reload_requested = False
+            self.reload_config()
+
+        if self.paused:
+            if self.manager.processes:
+                logging.info("Paused, stopping all processors")
+                self.manager.stop_all_processors()
+            return
+
+        self.manager.sync_processors()
+
+    def run(self):
+        self.install_signal_handlers()
+        logging.info(f"Headless service started with config {self.manager.config_file}")
+        try:
+            while self.running:
+                self.wake = False
+                self.check()
+                # Sleep in short steps so signals are handled promptly
+                deadline = time.monotonic() + self.poll_interval
+                while self.running and not self.wake and time.monotonic() < deadline:
+                    time.sleep(0.2)
+        finally:
+            self.manager.stop_all_processors()
+            logging.info("Headless service stopped.")
+
+if __name__ == "__main__":
+    args = parse_args()
+    HeadlessService(args.config, args.poll_interval).run()
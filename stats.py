@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from collections import deque
+
+# Local UDP port the GUI dashboard listens on; 0 in config.json disables reporting
+DEFAULT_STATS_PORT = 47650
+
+# Seconds between pushed updates and between scans of the watch folder
+REPORT_INTERVAL = 2
+SCAN_INTERVAL = 5
+
+# Window for the pages-per-minute rate
+RATE_WINDOW = 300
+
+# Bytes per page assumed for pending PDFs until this processor has converted some
+DEFAULT_BYTES_PER_PAGE = 150 * 1024
+
+class StatsReporter:
+    """Pushes a small JSON stats datagram for one processor to the dashboard over local UDP.
+
+    The backlog comes from a periodic scan of the watch folder (two levels deep);
+    throughput comes from counters the handler updates as it converts pages, so
+    no log file is parsed. UDP keeps the processor independent of the GUI: if
+    nothing listens, the datagrams are simply dropped.
+    """
+
+    def __init__(self, port, profile, processor, watch_dir, extensions, governor=None):
+        self.address = ("127.0.0.1", port)
+        self.profile = profile
+        self.processor = processor
+        self.watch_dir = watch_dir
+        self.extensions = extensions
+        self.governor = governor  # IOGovernor whose waiting time is reported
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.pages_done = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.pages_in_files_done = 0
+        self.current_file = None
+        self.current_size = 0
+        self.current_pages = 0
+        self.current_workers = 0
+        self.current_remaining = []  # Inputs of a folder converted outside the watch folder, pending while they exist
+        self.history = deque()  # (time, pages_done, I/O wait) samples for the rates
+        self.backlog = {"pending_files": 0, "pending_bytes": 0, "pending_pages": 0, "oldest_pending": None}
+        self.last_scan = 0
+
+    def file_started(self, path, workers=1):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        with self.lock:
+            self.current_file = path
+            self.current_size = size
+            self.current_pages = 0
+            self.current_workers = workers
+
+    def folder_started(self, paths):
+        """Counts the inputs of a folder moved out of the watch folder as pending until they are removed."""
+        with self.lock:
+            self.current_remaining = list(paths)
+
+    def folder_finished(self):
+        with self.lock:
+            self.current_remaining = []
+
+    def page_done(self):
+        with self.lock:
+            self.pages_done += 1
+            self.current_pages += 1
+
+    def add_pages(self, count):
+        """Counts pages converted by pool workers on behalf of this processor."""
+        with self.lock:
+            self.pages_done += count
+
+    def file_finished(self):
+        with self.lock:
+            self.files_done += 1
+            if self.current_file and self.current_file.lower().endswith(".pdf") and self.current_pages:
+                self.bytes_done += self.current_size
+                self.pages_in_files_done += self.current_pages
+            self.current_file = None
+
+    def bytes_per_page(self):
+        if self.pages_in_files_done:
+            return self.bytes_done / self.pages_in_files_done
+        return DEFAULT_BYTES_PER_PAGE
+
+    def scan(self):
+        """Counts waiting input files in the watch folder, in folders one level below and in current_remaining."""
+        pending_files = pending_bytes = pending_pages = 0
+        oldest = None
+        try:
+            entries = list(os.scandir(self.watch_dir))
+        except OSError as e:
+            logging.warning(f"Stats scan of {self.watch_dir} failed: {e}")
+            return
+        inputs = []
+        for entry in entries:
+            try:
+                children = list(os.scandir(entry.path)) if entry.is_dir() else [entry]
+            except OSError:
+                continue
+            inputs.extend(child.path for child in children if child.is_file())
+        with self.lock:
+            inputs.extend(self.current_remaining)
+        for path in inputs:
+            if not path.lower().endswith(self.extensions):
+                continue
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue  # Converted and removed since
+            pending_files += 1
+            pending_bytes += info.st_size
+            if path.lower().endswith(".pdf"):
+                pending_pages += max(1, round(info.st_size / self.bytes_per_page()))
+            else:
+                pending_pages += 1  # A JPEG is one page
+            oldest = info.st_mtime if oldest is None else min(oldest, info.st_mtime)
+        self.backlog = {
+            "pending_files": pending_files,
+            "pending_bytes": pending_bytes,
+            "pending_pages": pending_pages,
+            "oldest_pending": oldest,
+        }
+
+    def snapshot(self):
+        now = time.time()
+        io_wait = self.governor.waited if self.governor is not None else 0.0
+        with self.lock:
+            self.history.append((now, self.pages_done, io_wait))
+            while len(self.history) > 1 and now - self.history[0][0] > RATE_WINDOW:
+                self.history.popleft()
+            first_time, first_pages, first_io_wait = self.history[0]
+            elapsed = now - first_time
+            rate = (self.pages_done - first_pages) / elapsed * 60 if elapsed > 0 else 0.0
+            io_wait_rate = (io_wait - first_io_wait) / elapsed * 60 if elapsed > 0 else 0.0
+            return dict(
+                self.backlog,
+                profile=self.profile,
+                processor=self.processor,
+                pid=os.getpid(),
+                time=now,
+                busy=self.current_workers if self.current_file else 0,
+                current_file=self.current_file,
+                pages_done=self.pages_done,
+                files_done=self.files_done,
+                pages_per_minute=round(rate, 1),
+                io_wait=round(io_wait, 1),
+                io_wait_per_minute=round(io_wait_rate, 1),
+            )
+
+    def send(self):
+        try:
+            self.sock.sendto(json.dumps(self.snapshot()).encode("utf-8"), self.address)
+        except OSError:
+            pass  # Dashboard not running
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if time.monotonic() - self.last_scan >= SCAN_INTERVAL:
+                self.scan()
+                self.last_scan = time.monotonic()
+            self.send()
+            self.stop_event.wait(REPORT_INTERVAL)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="stats-reporter", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.sock.close()
+
+class PageCounter:
+    """Stands in for a StatsReporter in pool workers, which only count their pages."""
+
+    def __init__(self):
+        self.pages = 0
+
+    def file_started(self, path, workers=1):
+        pass
+
+    def page_done(self):
+        self.pages += 1
+
+    def file_finished(self):
+        pass
+
+# Reports older than this are treated as coming from a processor that is gone
+STALE_AFTER = 3 * REPORT_INTERVAL + SCAN_INTERVAL
+
+def summarize_profile(reports, now=None):
+    """Combines the latest reports of one profile's processors into dashboard figures."""
+    now = now if now is not None else time.time()
+    live = [report for report in reports if now - report.get("time", 0) <= STALE_AFTER]
+    oldest = [report["oldest_pending"] for report in live if report.get("oldest_pending")]
+    summary = {
+        "processors": len(live),
+        "pending_files": sum(report.get("pending_files", 0) for report in live),
+        "pending_pages": sum(report.get("pending_pages", 0) for report in live),
+        "pages_per_minute": sum(report.get("pages_per_minute", 0) for report in live),
+        "busy": sum(report.get("busy", 0) for report in live),
+        "io_wait_per_minute": sum(report.get("io_wait_per_minute", 0) for report in live),
+        "oldest_age": now - min(oldest) if oldest else None,
+        "eta": None,
+    }
+    if summary["pending_pages"] and summary["pages_per_minute"]:
+        summary["eta"] = summary["pending_pages"] / summary["pages_per_minute"] * 60
+    return summary
@@ -0,0 +1,34 @@
+import io_governor
+
+def test_unlimited_dimension_runs_up_no_debt(tmp_path):
+    governor = io_governor.IOGovernor(str(tmp_path))
+    governor.configure({"ops_per_second": 1000000}, None)
+    for _ in range(200):
+        governor.acquire(1000000, 1)
+    governor.configure({"ops_per_second": 1000000, "bytes_per_second": 10000000}, None)
+    assert governor.acquire(100000, 1, small=True) < 0.1
+    governor.close()
+
+def test_debt_is_dropped_when_limits_change(tmp_path):
+    governor = io_governor.IOGovernor(str(tmp_path))
+    governor.configure({"bytes_per_second": 1000}, None)
+    governor.acquire(50000, 1)  # Let through on a full bucket, leaves 49 seconds of debt
+    governor.configure({"bytes_per_second": 2000}, None)
+    assert governor.acquire(100, 1, small=True) < 0.2
+    governor.close()
+
+def test_debt_is_paid_back_under_the_same_limits(tmp_path):
+    governor = io_governor.IOGovernor(str(tmp_path))
+    governor.configure({"bytes_per_second": 1000}, None)
+    governor.acquire(1500, 1)  # Leaves 500 bytes of debt
+    assert 0.4 < governor.acquire(100, 1, small=True) < 1.0
+    governor.close()
+
+def test_limits_are_shared_through_the_state_file(tmp_path):
+    first, second = io_governor.IOGovernor(str(tmp_path)), io_governor.IOGovernor(str(tmp_path))
+    first.configure({"bytes_per_second": 1000}, None)
+    second.configure({"bytes_per_second": 1000}, None)
+    first.acquire(1000, 1, small=True)  # Drains the shared burst
+    assert second.acquire(500, 1, small=True) > 0.3
+    first.close()
+    second.close()
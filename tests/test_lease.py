@@ -0,0 +1,52 @@
+import os
+import time
+import lease
+
+def managers(tmp_path, ttl=120):
+    lease_dir = str(tmp_path / "leases")
+    return lease.LeaseManager(lease_dir, ttl, node_id="a"), lease.LeaseManager(lease_dir, ttl, node_id="b")
+
+def test_acquire_is_exclusive(tmp_path):
+    a, b = managers(tmp_path)
+    assert a.acquire("scan.pdf")
+    assert not b.acquire("scan.pdf")
+    assert not a.acquire("scan.pdf")  # Already held here
+    assert b.acquire("other.pdf")
+
+def test_release_lets_a_peer_acquire(tmp_path):
+    a, b = managers(tmp_path)
+    with a.claim("scan.pdf") as claimed:
+        assert claimed
+        assert not b.acquire("scan.pdf")
+    assert not os.path.exists(a.lease_path("scan.pdf"))
+    assert b.acquire("scan.pdf")
+    a.release("scan.pdf")  # Not held by a, leaves b's lease alone
+    assert b.read_lease(b.lease_path("scan.pdf"))["owner"] == "b"
+
+def test_expired_lease_is_taken_over(tmp_path):
+    a, b = managers(tmp_path, ttl=0.2)
+    assert a.acquire("scan.pdf")  # No heartbeat, as if a crashed
+    assert not b.acquire("scan.pdf")
+    time.sleep(0.3)
+    assert b.acquire("scan.pdf")
+    assert b.read_lease(b.lease_path("scan.pdf"))["owner"] == "b"
+    a.renew_all()  # a notices the loss instead of renewing b's lease
+    assert "scan.pdf" not in a.held
+    assert b.read_lease(b.lease_path("scan.pdf"))["owner"] == "b"
+
+def test_sweep_claims_only_input_items(tmp_path):
+    watch_dir = tmp_path / "watch"
+    (watch_dir / "folder").mkdir(parents=True)
+    for name in ("scan.pdf", "scan_page1.jpeg", "control.txt"):
+        (watch_dir / name).write_bytes(b"")
+    a, b = managers(tmp_path)
+    assert b.acquire("folder")
+    handled = []
+    claims = lease.WatchFolderClaims(
+        str(watch_dir), lambda path, is_directory: handled.append(os.path.basename(path)), (".pdf",), a, ignore=("control.txt",)
+    )
+    claims.sweep()
+    assert handled == ["scan.pdf"]
+    assert not a.held  # Released once handled
+    claims.sweep()  # Still there and unchanged, not handled again
+    assert handled == ["scan.pdf"]
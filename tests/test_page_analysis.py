@@ -0,0 +1,23 @@
+import io
+import fitz
+from PIL import Image
+import page_analysis
+
+def scanned_page(pixels):
+    """A one-inch page covered by a pixels x pixels image, i.e. scanned at pixels dpi."""
+    buffer = io.BytesIO()
+    Image.new("L", (pixels, pixels), 128).save(buffer, "PNG")
+    doc = fitz.open()
+    page = doc.new_page(width=72, height=72)
+    page.insert_image(page.rect, stream=buffer.getvalue())
+    return doc, page
+
+def test_render_dpi_follows_scan_resolution():
+    doc, page = scanned_page(150)
+    assert page_analysis.render_dpi(page, 100, 300) == 150
+    assert page_analysis.render_dpi(page, 100, 120) == 120
+    assert page_analysis.render_dpi(page, 200, 300) == 200
+
+def test_render_dpi_caps_min_dpi_at_dpi():
+    doc, page = scanned_page(50)
+    assert page_analysis.render_dpi(page, 100, 72) == 72
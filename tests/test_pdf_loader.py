@@ -0,0 +1,47 @@
+import os
+import shutil
+import fitz
+import pytest
+import pdf_loader
+
+@pytest.fixture
+def pdf_file(tmp_path):
+    path = tmp_path / "doc.pdf"
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(str(path))
+    return str(path)
+
+@pytest.fixture(autouse=True)
+def staging_dir(tmp_path, monkeypatch):
+    staging = tmp_path / "staging"
+    monkeypatch.setattr(pdf_loader, "STAGING_DIR", str(staging))
+    yield staging
+    pdf_loader.set_buffer_limit(pdf_loader.MAX_BUFFERED_BYTES)
+
+def test_workers_share_the_buffer_cap():
+    assert pdf_loader.worker_buffer_limit(4) * 4 == pdf_loader.MAX_BUFFERED_BYTES
+    assert pdf_loader.worker_buffer_limit(0) == pdf_loader.MAX_BUFFERED_BYTES
+
+def test_file_above_the_process_share_is_staged(pdf_file, monkeypatch):
+    staged = []
+    stage_file = pdf_loader.stage_file
+    monkeypatch.setattr(pdf_loader, "stage_file", lambda path: staged.append(path) or stage_file(path))
+    with pdf_loader.open_pdf(pdf_file) as doc:
+        assert len(doc) == 1
+    assert staged == []
+
+    pdf_loader.set_buffer_limit(os.path.getsize(pdf_file) - 1)
+    with pdf_loader.open_pdf(pdf_file) as doc:
+        assert len(doc) == 1
+    assert staged == [pdf_file]
+    assert pdf_loader.budget.used == 0
+
+def test_failed_staging_copy_is_removed(pdf_file, staging_dir, monkeypatch):
+    def broken_copy(src, dst, length):
+        dst.write(src.read(10))
+        raise OSError("connection reset")
+    monkeypatch.setattr(shutil, "copyfileobj", broken_copy)
+    with pytest.raises(OSError):
+        pdf_loader.stage_file(pdf_file)
+    assert os.listdir(staging_dir) == []
@@ -0,0 +1,15 @@
+import pytest
+import render_settings
+
+def test_fixed_mode_accepts_dpi_below_default_min_dpi():
+    settings = render_settings.profile_settings({"render": {"dpi": 72}})
+    assert settings["dpi"] == 72
+    assert settings["min_dpi"] == 100
+
+def test_adaptive_mode_accepts_dpi_below_min_dpi():
+    settings = render_settings.profile_settings({"render": {"dpi": 72, "dpi_mode": "adaptive"}})
+    assert settings["dpi"] == 72
+
+def test_invalid_setting_is_rejected():
+    with pytest.raises(ValueError):
+        render_settings.profile_settings({"render": {"dpi": 5}})
@@ -0,0 +1,30 @@
+import os
+import stats
+
+def test_scan_counts_remaining_inputs_of_a_folder_in_progress(tmp_path):
+    watch_dir, output_dir = tmp_path / "watch", tmp_path / "COMPLETE" / "folder"
+    watch_dir.mkdir()
+    output_dir.mkdir(parents=True)
+    (watch_dir / "waiting.pdf").write_bytes(b"x" * 1000)
+    remaining = []
+    for name in ("a.pdf", "b.pdf", "notes.txt"):
+        (output_dir / name).write_bytes(b"x" * 1000)
+        remaining.append(str(output_dir / name))
+
+    reporter = stats.StatsReporter(0, "P", "jpeg_processor", str(watch_dir), (".pdf",))
+    reporter.scan()
+    assert reporter.backlog["pending_files"] == 1
+
+    reporter.folder_started(remaining)
+    reporter.scan()
+    assert reporter.backlog["pending_files"] == 3
+    assert reporter.backlog["pending_bytes"] == 3000
+
+    os.remove(remaining[0])  # Converted
+    reporter.scan()
+    assert reporter.backlog["pending_files"] == 2
+
+    reporter.folder_finished()
+    reporter.scan()
+    assert reporter.backlog["pending_files"] == 1
+    reporter.sock.close()
@@ -1,46 +1,114 @@
 import sys
 import os
 import time
+import signal
 import shutil
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import fitz  # PyMuPDF
 from PIL import Image
 import io
 import argparse
 import logging
-
-# Configure logging
-logging.basicConfig(
-    filename="tiff_processor.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+import multiprocessing
+import batch
+import lease
+import page_analysis
+import pdf_loader
+import log_setup
+import tracing
+import profiling
+import stats
+import render_settings
+import io_governor
+import manifest
+
+# Files the processor converts, everything else in the watch folder is left alone
+INPUT_EXTENSIONS = (".pdf", ".jpeg", ".jpg")
+
+PROCESSOR = "tiff_processor"  # Name used for log, trace and profile files
+
+# TIFF compression per output image mode
+COMPRESSION = {"1": "group4", "L": "tiff_lzw"}
 
 def parse_args():
     parser = argparse.ArgumentParser(description="TIFF Processor for PDFs and JPEGs")
-    parser.add_argument('--watch-dir', required=True, help='Directory to watch for new folders with PDFs and JPEGs')
-    parser.add_argument('--output-dir', required=True, help='Directory to move completed folders')
+    parser.add_argument('--watch-dir', help='Directory to watch for new folders with PDFs and JPEGs')
+    parser.add_argument('--output-dir', help='Directory to move completed folders')
     parser.add_argument('--max-retries', type=int, default=10, help='Maximum number of retries for processing a file')
-    return parser.parse_args()
+    parser.add_argument('--once', action='store_true', help='Convert the given inputs in one batch run and exit, without watching')
+    parser.add_argument('inputs', nargs='*', help='With --once: PDF/JPEG files or folders to convert (searched recursively)')
+    parser.add_argument('--file-list', help='With --once: text file listing one PDF/JPEG path per line')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='With --once: number of worker processes')
+    parser.add_argument('--journal', help='With --once: journal of completed files, rerun with the same journal to resume')
+    parser.add_argument('--blank-pages', choices=('off', 'skip', 'tag'), default='off', help='Skip blank pages or only list them in a sidecar JSON')
+    parser.add_argument('--blank-threshold', type=float, default=0.001, help='Ink coverage (0-1) at or below which a page counts as blank')
+    parser.add_argument('--profile', help='Profile name, used in log file names and log records')
+    parser.add_argument('--config', help='config.json to read the render settings of --profile from; changes apply from the next file')
+    parser.add_argument('--log-dir', default='.', help='Directory for the rotating JSON log')
+    parser.add_argument('--page-log-every', type=int, default=1, help='Log only every Nth per-page record')
+    parser.add_argument('--stats-port', type=int, default=0, help='Push live stats to the dashboard on this local UDP port (0 disables)')
+    parser.add_argument('--trace-dir', help='Write Chrome/Perfetto trace events for every processed item to this directory')
+    parser.add_argument('--shared', action='store_true', help='Claim items with lease files so several hosts can share the watch folder')
+    parser.add_argument('--lease-dir', help='Lease folder for --shared (default: .leases next to the watch folder)')
+    parser.add_argument('--lease-ttl', type=float, default=120, help='Seconds before a lease of a silent host expires')
+    parser.add_argument('--node-id', help='Lease owner name (default: hostname:pid)')
+    args = parser.parse_args()
+    if args.once:
+        if not args.inputs and not args.file_list:
+            parser.error('--once needs input paths or --file-list')
+    elif not args.watch_dir or not args.output_dir:
+        parser.error('--watch-dir and --output-dir are required unless --once is given')
+    return args
+
+def to_output_image(img, settings):
+    """Converts a page image to the TIFF output mode: 1-bit at the configured threshold or 8-bit gray."""
+    gray = img.convert("L")
+    if settings["output_mode"] == "gray":
+        return gray
+    if settings["threshold_method"] == "otsu":
+        threshold = page_analysis.otsu_threshold(gray)
+    else:
+        threshold = settings["threshold"]
+    return gray.point(lambda x: 0 if x < threshold else 255, "1")  # Binarize (1-bit black & white)
+
+def source_resolution(img):
+    """Returns the (x, y) resolution a JPEG declares in dots per inch, None if it declares none."""
+    dpi = img.info.get("dpi")
+    if not dpi or len(dpi) != 2 or min(dpi) <= 0:
+        return None
+    return tuple(round(float(value), 2) for value in dpi)
 
 class PDFJPEGHandler(FileSystemEventHandler):
-    def __init__(self, output_directory, watch_directory, max_retries=10):
+    def __init__(self, output_directory, watch_directory, settings=None, leases=None):
         self.output_directory = output_directory
         self.watch_directory = watch_directory
-        self.max_retries = max_retries
+        self.settings = settings or dict(render_settings.DEFAULTS)  # Replaced as a whole when config.json changes
+        self.profiling = None  # ProfilingController counting processed files
+        self.stats = None  # StatsReporter feeding the dashboard
+        self.governor = io_governor.IOGovernor()  # Unlimited until limits are configured
+        self.pool = None  # FolderPool converting the files of a folder when settings ask for several workers
+        self.folder_manifest = None  # FolderManifest of the folder being converted
+        # Claims items through leases when several hosts share the watch folder; the control file is picked up by the main loop
+        self.claims = lease.WatchFolderClaims(
+            watch_directory, self.handle_path, INPUT_EXTENSIONS, leases, ignore=(profiling.CONTROL_FILE,)
+        )
 
     def on_created(self, event):
-        if event.is_directory:
-            logging.info(f"New folder detected: {event.src_path}")
+        self.claims.claim_and_handle(event.src_path, event.is_directory)
+
+    def handle_path(self, path, is_directory):
+        if is_directory:
+            logging.info(f"New folder detected: {path}")
             # Optionally process the entire directory
-            self.process_directory(event.src_path)
+            self.process_directory(path)
         else:
-            logging.info(f"New file detected: {event.src_path}")
-            if self.wait_for_file_stability(event.src_path):
-                self.process_file(event.src_path)
+            logging.info(f"New file detected: {path}")
+            with tracing.span("stability_wait"):
+                stable = self.wait_for_file_stability(path)
+            if stable:
+                self.process_file(path)
             else:
-                logging.warning(f"File stability check failed for: {event.src_path}")
+                logging.warning(f"File stability check failed for: {path}")
 
     def wait_for_file_stability(self, file_path, stability_duration=10):
         """Waits until the file is stable (size doesn't change for a certain duration)."""
@@ -94,7 +162,7 @@ class PDFJPEGHandler(FileSystemEventHandler):
 
 
     def process_file(self, file_path):
-        """Processes a single file (JPEG or PDF)."""
+        """Processes a single file (JPEG or PDF) and returns whether it succeeded."""
         if file_path.lower().endswith((".jpeg", ".jpg")):
             if self.process_jpeg(file_path):
                 try:
@@ -102,24 +170,31 @@ class PDFJPEGHandler(FileSystemEventHandler):
                     logging.info(f"Deleted processed JPEG: {file_path}")
                 except Exception as e:
                     logging.error(f"Failed to delete JPEG {file_path}: {e}")
-            else:
-                logging.error(f"Failed to process JPEG: {file_path}")
+                return True
+            logging.error(f"Failed to process JPEG: {file_path}")
+            return False
         elif file_path.lower().endswith(".pdf"):
             pdf_result = self.process_pdf(file_path)
             if not pdf_result['failed_pages']:
                 logging.info(f"Successfully processed PDF: {file_path}")
-                try:
-                    os.remove(file_path)
-                    logging.info(f"Deleted processed PDF: {file_path}")
-                except Exception as e:
-                    logging.error(f"Failed to delete PDF {file_path}: {e}")
-            else:
-                logging.error(f"Failed to process PDF: {file_path}")
+                # process_pdf already removes the PDF once every page succeeded
+                if os.path.exists(file_path):
+                    try:
+                        os.remove(file_path)
+                        logging.info(f"Deleted processed PDF: {file_path}")
+                    except Exception as e:
+                        logging.error(f"Failed to delete PDF {file_path}: {e}")
+                return True
+            logging.error(f"Failed to process PDF: {file_path}")
+            return False
         else:
             logging.info(f"Ignoring non-JPEG/PDF file: {file_path}")
+            return False
 
     def process_directory(self, folder_path):
-        if not self.wait_for_folder_stability(folder_path):
+        with tracing.span("stability_wait"):
+            stable = self.wait_for_folder_stability(folder_path)
+        if not stable:
             logging.warning(f"Stability check failed for folder: {folder_path}")
             return
 
@@ -127,6 +202,31 @@ class PDFJPEGHandler(FileSystemEventHandler):
         jpeg_files = [os.path.join(folder_path, f) for f in all_files if f.lower().endswith((".jpeg", ".jpg"))]
         pdf_files = [os.path.join(folder_path, f) for f in all_files if f.lower().endswith(".pdf")]
 
+        settings = self.settings
+        self.folder_manifest = manifest.FolderManifest()
+        try:
+            if self.pool is not None and settings["workers"] > 1 and len(jpeg_files) + len(pdf_files) > 1:
+                self.process_in_pool(folder_path, jpeg_files + pdf_files, settings)
+            else:
+                self.process_files(jpeg_files, pdf_files)
+        finally:
+            folder_manifest, self.folder_manifest = self.folder_manifest, None
+
+        # Move folder after processing
+        destination_folder = os.path.join(self.output_directory, os.path.basename(folder_path))
+        with tracing.span("move_folder"):
+            self.move_folder(folder_path, destination_folder)
+
+        # Last step of publishing, consumers take the folder as done once it has a manifest
+        try:
+            with tracing.span("manifest"):
+                published = folder_manifest.publish(destination_folder, self.output_directory, PROCESSOR)
+            logging.info(f"Published {destination_folder} with a manifest of {len(published['files'])} files")
+        except Exception as e:
+            logging.error(f"Failed to write the manifest of {destination_folder}: {e}")
+
+    def process_files(self, jpeg_files, pdf_files):
+        """Converts the JPEGs and PDFs of a folder one after another."""
         # Process JPEG files
         for jpeg_file in jpeg_files:
             if self.process_jpeg(jpeg_file):
@@ -144,56 +244,143 @@ class PDFJPEGHandler(FileSystemEventHandler):
                 except Exception as e:
                     logging.error(f"Failed to delete PDF {pdf_file}: {e}")
 
-        # Move folder after processing
-        destination_folder = os.path.join(self.output_directory, os.path.basename(folder_path))
-        self.move_folder(folder_path, destination_folder)
+    def process_in_pool(self, folder_path, files, settings):
+        """Converts the files of a folder in parallel worker processes."""
+        workers = min(settings["workers"], len(files))
+        logging.info(f"Converting {len(files)} files in {folder_path} with {workers} workers")
+        if self.stats is not None:
+            self.stats.file_started(folder_path, workers)
+        try:
+            with tracing.span("process_in_pool", workers=workers):
+                # Workers continue this folder's trace, pages are counted as each file finishes
+                trace_id = tracing.current_trace_id()
+                buffer_limit = pdf_loader.worker_buffer_limit(workers)
+                items = [(file_path, settings, trace_id, buffer_limit) for file_path in files]
+                for (file_path, *_), (ok, pages, file_manifest) in self.pool.imap_unordered(process_folder_file, items, workers):
+                    if not ok:
+                        logging.error(f"Failed to process file: {file_path}")
+                    self.folder_manifest.update(file_manifest)
+                    if self.stats is not None:
+                        self.stats.add_pages(pages)
+                    if self.profiling is not None:
+                        self.profiling.file_done()
+        except Exception as e:
+            logging.error(f"Worker pool failed for {folder_path}, converting the remaining files here: {e}")
+            self.pool.close()
+            if self.stats is not None:
+                self.stats.file_finished()
+            remaining = [file_path for file_path in files if os.path.exists(file_path)]
+            self.process_files(
+                [f for f in remaining if f.lower().endswith((".jpeg", ".jpg"))],
+                [f for f in remaining if f.lower().endswith(".pdf")]
+            )
+            return
+        if self.stats is not None:
+            self.stats.file_finished()
 
     def move_folder(self, src_folder, dest_folder):
         if not os.path.exists(dest_folder):
-            shutil.move(src_folder, dest_folder)
+            self.governor.move(src_folder, dest_folder)
             logging.info(f"Moved folder: {src_folder} -> {dest_folder}")
         else:
             for root, _, files in os.walk(src_folder):
                 target_folder = os.path.join(dest_folder, os.path.relpath(root, src_folder))
                 os.makedirs(target_folder, exist_ok=True)
                 for file in files:
-                    shutil.move(os.path.join(root, file), os.path.join(target_folder, file))
+                    self.governor.move(os.path.join(root, file), os.path.join(target_folder, file))
             shutil.rmtree(src_folder)
 
     def process_pdf(self, pdf_file):
         """Converts each page of the PDF to a TIFF file and deletes the PDF after successful processing."""
+        if self.stats is not None:
+            self.stats.file_started(pdf_file)
+        settings = self.settings  # Settings changed while converting apply from the next file
+        waited = self.governor.waited
+        started = time.perf_counter()
+        with tracing.span("process_pdf", file=pdf_file):
+            result = self.convert_pdf(pdf_file, settings)
+        if self.governor.waited - waited >= 0.1:
+            logging.info(f"Waited {self.governor.waited - waited:.1f}s for the I/O governor writing pages of {pdf_file}")
+        if self.folder_manifest is not None:
+            self.folder_manifest.add_source(pdf_file, not result['failed_pages'], settings, time.perf_counter() - started)
+        if self.stats is not None:
+            self.stats.file_finished()
+        if self.profiling is not None:
+            self.profiling.file_done()
+        return result
+
+    def convert_pdf(self, pdf_file, settings):
+        """Page loop of process_pdf."""
+        adaptive_dpi = settings["dpi_mode"] == "adaptive"
+        blank_pages_mode = settings["blank_pages"]
         processed_pages = []
         failed_pages = []
-        
-        try:
-            doc = fitz.open(pdf_file)
-            total_pages = len(doc)
-            logging.info(f"Processing {total_pages} pages in PDF: {pdf_file}")
-
-            for page_num in range(total_pages):
-                try:
-                    # Load the page and create a Pixmap
-                    page = doc[page_num]
-                    pix = page.get_pixmap(dpi=200)
-
-                    # Convert the Pixmap to a Pillow Image
-                    img = Image.open(io.BytesIO(pix.tobytes("ppm"))).convert("L")
-                    img = img.point(lambda x: 0 if x < 128 else 255, "1")  # Binarize (1-bit black & white)
-
-                    # Save as TIFF with Group 4 compression
-                    output_tiff = os.path.join(
-                        os.path.dirname(pdf_file),
-                        f"{os.path.splitext(os.path.basename(pdf_file))[0]}_page_{page_num + 1:04d}.tif"
-                    )
-                    img.save(output_tiff, "TIFF", compression="group4", dpi=(200, 200))
-                    logging.info(f"Saved TIFF: {output_tiff}")
-                    processed_pages.append(output_tiff)
+        blank_pages = []
 
-                except Exception as e:
-                    logging.error(f"Error processing page {page_num + 1} of {pdf_file}: {e}")
-                    failed_pages.append(page_num + 1)
-
-            doc.close()
+        try:
+            with pdf_loader.open_pdf(pdf_file) as doc:
+                total_pages = len(doc)
+                small_job = total_pages <= io_governor.SMALL_JOB_PAGES  # Gets priority on throttled writes
+                logging.info(f"Processing {total_pages} pages in PDF: {pdf_file}")
+
+                for page_num in range(total_pages):
+                    page_start = time.perf_counter()
+                    try:
+                        # Load the page and create a Pixmap
+                        page = doc[page_num]
+
+                        # Measure ink on a low-resolution preview before paying for the full render
+                        if blank_pages_mode != "off":
+                            with tracing.span("preview", page=page_num + 1):
+                                preview = page_analysis.render_preview(page)
+                            if page_analysis.ink_coverage(preview) <= settings["blank_threshold"]:
+                                blank_pages.append(page_num + 1)
+                                if blank_pages_mode == "skip":
+                                    logging.info(f"Skipped blank page {page_num + 1} of {pdf_file}", extra={
+                                        "per_page": True, "file": pdf_file, "page": page_num + 1
+                                    })
+                                    continue
+
+                        # Scanned pages are rendered at no more than their scan resolution
+                        dpi = settings["dpi"]
+                        if adaptive_dpi:
+                            dpi = page_analysis.render_dpi(page, settings["min_dpi"], dpi)
+
+                        with tracing.span("get_pixmap", page=page_num + 1, dpi=dpi):
+                            pix = page.get_pixmap(dpi=dpi)
+
+                        # Convert the Pixmap to a Pillow Image
+                        with tracing.span("binarize", page=page_num + 1):
+                            img = to_output_image(Image.open(io.BytesIO(pix.tobytes("ppm"))), settings)
+
+                        # Save as TIFF, Group 4 compressed when binarized
+                        output_tiff = os.path.join(
+                            os.path.dirname(pdf_file),
+                            f"{os.path.splitext(os.path.basename(pdf_file))[0]}_page_{page_num + 1:04d}.tif"
+                        )
+                        with tracing.span("save", page=page_num + 1):
+                            data = self.governor.save_image(img, output_tiff, "TIFF", small_job, compression=COMPRESSION[img.mode], dpi=(dpi, dpi))
+                        duration_ms = round((time.perf_counter() - page_start) * 1000, 1)
+                        if self.folder_manifest is not None:
+                            self.folder_manifest.add_file(output_tiff, pdf_file, page_num + 1, data, dpi=dpi, duration_ms=duration_ms)
+                        if self.stats is not None:
+                            self.stats.page_done()
+                        logging.info(f"Saved TIFF: {output_tiff}", extra={
+                            "per_page": True, "file": pdf_file, "page": page_num + 1, "dpi": dpi,
+                            "duration_ms": duration_ms
+                        })
+                        processed_pages.append(output_tiff)
+
+                    except Exception as e:
+                        logging.error(f"Error processing page {page_num + 1} of {pdf_file}: {e}")
+                        failed_pages.append(page_num + 1)
+
+            if blank_pages:
+                action = "skipped" if blank_pages_mode == "skip" else "tagged"
+                sidecar = page_analysis.write_blank_pages_sidecar(pdf_file, total_pages, blank_pages, action)
+                logging.info(f"Blank pages {blank_pages} of {pdf_file} {action}, listed in {sidecar}")
+                if self.folder_manifest is not None:
+                    self.folder_manifest.add_file(sidecar, pdf_file)
 
             if not failed_pages:
                 try:
@@ -206,49 +393,208 @@ class PDFJPEGHandler(FileSystemEventHandler):
             logging.error(f"Critical error processing PDF to TIFF {pdf_file}: {e}")
             failed_pages.append(f"Critical error: {e}")
 
-        return {'processed_pages': processed_pages, 'failed_pages': failed_pages}
+        return {'processed_pages': processed_pages, 'failed_pages': failed_pages, 'blank_pages': blank_pages}
 
     def process_jpeg(self, jpeg_file):
+        if self.stats is not None:
+            self.stats.file_started(jpeg_file)
+        settings = self.settings
+        started = time.perf_counter()
+        with tracing.span("process_jpeg", file=jpeg_file):
+            result = self.convert_jpeg(jpeg_file, settings)
+        if self.folder_manifest is not None:
+            self.folder_manifest.add_source(jpeg_file, result, settings, time.perf_counter() - started)
+        if self.stats is not None:
+            self.stats.file_finished()
+        if self.profiling is not None:
+            self.profiling.file_done()
+        return result
+
+    def convert_jpeg(self, jpeg_file, settings):
+        """Retry loop of process_jpeg."""
+        max_retries = settings["max_retries"]
         retry_count = 0  # Initialize retry_count to 0
-        while retry_count < self.max_retries:
+        while retry_count < max_retries:
             try:
-                img = Image.open(jpeg_file).convert("L")
-                img = img.point(lambda x: 0 if x < 128 else 255, "1")
+                page_start = time.perf_counter()
+                source = Image.open(jpeg_file)
+                # The image isn't resampled, so the TIFF keeps the JPEG's own resolution when it has one
+                dpi = source_resolution(source) or (settings["dpi"], settings["dpi"])
+                img = to_output_image(source, settings)
                 output_tiff = os.path.join(
                     os.path.dirname(jpeg_file),
                     f"{os.path.splitext(os.path.basename(jpeg_file))[0]}.tif"
                 )
-                img.save(output_tiff, "TIFF", compression="group4", dpi=(200, 200))
+                data = self.governor.save_image(img, output_tiff, "TIFF", True, compression=COMPRESSION[img.mode], dpi=dpi)
+                if self.folder_manifest is not None:
+                    self.folder_manifest.add_file(
+                        output_tiff, jpeg_file, 1, data, dpi=dpi[0],
+                        duration_ms=round((time.perf_counter() - page_start) * 1000, 1)
+                    )
+                if self.stats is not None:
+                    self.stats.page_done()
                 logging.info(f"Successfully processed JPEG: {jpeg_file}")
                 return True
             except Exception as e:
                 retry_count += 1
-                logging.warning(f"Retry {retry_count}/{self.max_retries} failed for JPEG {jpeg_file}: {e}")
+                logging.warning(f"Retry {retry_count}/{max_retries} failed for JPEG {jpeg_file}: {e}")
                 time.sleep(1)
-        logging.error(f"Failed to process JPEG {jpeg_file} after {self.max_retries} retries.")
+        logging.error(f"Failed to process JPEG {jpeg_file} after {max_retries} retries.")
         return False
 
-if __name__ == "__main__":
-    args = parse_args()
+def handle_sigterm(signum, frame):
+    """Turns termination by JobManager into the KeyboardInterrupt shutdown path."""
+    raise KeyboardInterrupt
+
+# Handler used by batch worker processes, created once per worker
+batch_handler = None
+
+def init_batch_worker(log_queue, profile, page_log_every, trace_dir, settings, config_file=None, buffer_limit=None):
+    global batch_handler
+    log_setup.attach_queue(log_queue, profile, PROCESSOR, page_log_every)
+    if buffer_limit is not None:
+        pdf_loader.set_buffer_limit(buffer_limit)
+    if trace_dir:
+        tracing.configure(trace_dir, profile, PROCESSOR)
+    batch_handler = PDFJPEGHandler(None, None, settings)
+    if config_file and profile:
+        batch_handler.governor.follow_config(config_file, profile)
+
+def process_batch_file(file_path, trace_id=None):
+    with tracing.trace("item", file_path, trace_id=trace_id):
+        return batch_handler.process_file(file_path)
+
+def process_folder_file(item):
+    """Converts one file of a watch-mode folder in a pool worker; returns (ok, pages saved, FolderManifest)."""
+    file_path, settings, trace_id, buffer_limit = item
+    pdf_loader.set_buffer_limit(buffer_limit)  # Share of the workers this folder runs with
+    batch_handler.settings = settings
+    batch_handler.governor.check_config()
+    batch_handler.stats = stats.PageCounter()
+    batch_handler.folder_manifest = manifest.FolderManifest()
+    try:
+        return bool(process_batch_file(file_path, trace_id)), batch_handler.stats.pages, batch_handler.folder_manifest
+    except Exception as e:
+        logging.error(f"Pool worker failed for {file_path}: {e}")
+        return False, batch_handler.stats.pages, batch_handler.folder_manifest
+
+def cli_settings(args):
+    """Render settings given on the command line."""
+    return dict(
+        render_settings.DEFAULTS, max_retries=args.max_retries,
+        blank_pages=args.blank_pages, blank_threshold=args.blank_threshold
+    )
+
+def load_settings(args):
+    """Render settings from the command line, overridden by the profile's block in --config."""
+    if args.config and args.profile:
+        return render_settings.load(args.config, args.profile, cli_settings(args))
+    return cli_settings(args)
+
+def run_once(args, settings, log_queue):
+    """Converts existing PDFs and JPEGs in place with a worker pool and returns the exit code."""
+    files = batch.collect_inputs(args.inputs, args.file_list, INPUT_EXTENSIONS)
+    return batch.run_batch(
+        "tiff", files, process_batch_file,
+        initializer=init_batch_worker,
+        initargs=(
+            log_queue, args.profile, args.page_log_every, args.trace_dir, settings, args.config,
+            pdf_loader.worker_buffer_limit(args.workers)
+        ),
+        workers=args.workers, journal_path=args.journal
+    )
+
+def run_watch(args, settings, log_listener):
+    """Watches the watch directory and processes new folders and files until interrupted."""
     watch_directory = args.watch_dir
     output_directory = args.output_dir
-    max_retries = args.max_retries
 
     if not os.path.exists(watch_directory):
         logging.error(f"Watch directory does not exist: {watch_directory}")
-        sys.exit()
+        return
 
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
 
-    event_handler = PDFJPEGHandler(output_directory, watch_directory, max_retries)
+    leases = None
+    if args.shared:
+        leases = lease.LeaseManager(args.lease_dir or lease.default_lease_dir(watch_directory), args.lease_ttl, args.node_id)
+        leases.start()
+        logging.info(f"Sharing {watch_directory} with other hosts as {leases.node_id}")
+
+    event_handler = PDFJPEGHandler(output_directory, watch_directory, settings, leases=leases)
+
+    # Folders are converted by worker processes when the render settings ask for more than one
+    pool_log_queue, pool_log_forwarder = log_setup.forward_process_queue(log_listener, batch.FolderPool.context)
+    event_handler.pool = batch.FolderPool(
+        init_batch_worker, (pool_log_queue, args.profile, args.page_log_every, args.trace_dir, settings, args.config)
+    )
+    watcher = None
+    if args.config and args.profile:
+        watcher = render_settings.SettingsWatcher(args.config, args.profile, cli_settings(args), settings)
+        watcher.check()
+        event_handler.governor.follow_config(args.config, args.profile)
     observer = Observer()
     observer.schedule(event_handler, watch_directory, recursive=True)
     observer.start()
 
+    # Profiling on demand via SIGUSR1 (POSIX) or a control file in the watch folder
+    profile_name = f"{args.profile}_{PROCESSOR}" if args.profile else PROCESSOR
+    event_handler.profiling = profiling.ProfilingController(args.log_dir, profile_name, watch_directory)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, event_handler.profiling.handle_signal)
+
+    # Live backlog and throughput for the dashboard in the GUI
+    if args.stats_port:
+        event_handler.stats = stats.StatsReporter(
+            args.stats_port, args.profile, PROCESSOR, watch_directory, INPUT_EXTENSIONS, event_handler.governor
+        )
+        event_handler.stats.start()
+
+    # Items left by other hosts are swept in the background
+    if leases is not None:
+        event_handler.claims.start_sweeping(args.lease_ttl)
+
     try:
         while True:
-            time.sleep(10)
+            event_handler.profiling.check()
+            event_handler.governor.check_config()
+            if watcher is not None:
+                new_settings = watcher.check()
+                if new_settings is not None:
+                    event_handler.settings = new_settings
+            time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    event_handler.claims.stop()
+    event_handler.pool.close()
+    event_handler.governor.close()
+    pool_log_forwarder.stop()
+    event_handler.profiling.close()
+    if event_handler.stats is not None:
+        event_handler.stats.stop()
+    if leases is not None:
+        leases.stop()
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    args = parse_args()
+
+    # Batch workers log through a multiprocessing queue into this process's listener
+    log_queue = multiprocessing.Queue(-1) if args.once else None
+    log_listener = log_setup.configure_logging(
+        log_setup.log_file_path(args.log_dir, args.profile, PROCESSOR),
+        profile=args.profile, processor=PROCESSOR, page_log_every=args.page_log_every, log_queue=log_queue
+    )
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    if args.trace_dir:
+        tracing.configure(args.trace_dir, args.profile, PROCESSOR)
+
+    try:
+        settings = load_settings(args)
+        if args.once:
+            sys.exit(run_once(args, settings, log_queue))
+        run_watch(args, settings, log_listener)
+    finally:
+        log_listener.stop()
@@ -0,0 +1,170 @@
+import os
+import glob
+import json
+import time
+import uuid
+import argparse
+import threading
+from contextlib import contextmanager, nullcontext
+
+# Returned by span()/trace() while tracing is off, so disabled tracing costs one check per call
+NULL_SPAN = nullcontext()
+
+class Tracer:
+    """Collects spans per processed item and appends them as Chrome Trace Event JSON.
+
+    Each item (a file or folder picked up by a processor) gets a trace ID when it
+    is detected; every span recorded on that thread until the item is done carries
+    it. Events are buffered per item and written when the item finishes, one
+    event per line, to <trace_dir>/<profile>_<processor>_<date>_<pid>.json. The
+    files use the JSON Array Format without the closing bracket, which
+    chrome://tracing and ui.perfetto.dev accept, so they can be appended to.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_dir = None
+        self.name = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def configure(self, trace_dir, profile=None, processor=None):
+        os.makedirs(trace_dir, exist_ok=True)
+        self.trace_dir = trace_dir
+        self.name = "_".join(part for part in (profile, processor) if part) or "trace"
+        self.enabled = True
+
+    def trace_file(self):
+        return os.path.join(self.trace_dir, f"{self.name}_{time.strftime('%Y%m%d')}_{os.getpid()}.json")
+
+    def current(self):
+        return getattr(self.local, "events", None), getattr(self.local, "trace_id", None)
+
+    def add_event(self, name, start_us, duration_us, args):
+        events, trace_id = self.current()
+        if events is None:
+            return  # Spans outside an item trace are not recorded
+        events.append({
+            "name": name, "cat": self.name, "ph": "X",
+            "ts": start_us, "dur": duration_us,
+            "pid": os.getpid(), "tid": threading.get_native_id(),
+            "args": dict(args, trace_id=trace_id),
+        })
+
+    @contextmanager
+    def span(self, name, args):
+        start_us = time.time_ns() // 1000
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_event(name, start_us, int((time.perf_counter() - start) * 1e6), args)
+
+    @contextmanager
+    def trace(self, name, path, args, trace_id=None):
+        if getattr(self.local, "events", None) is not None:
+            # Already inside an item, e.g. a PDF of a folder: record a nested span only
+            with self.span(name, dict(args, path=path)):
+                yield
+            return
+
+        self.local.events = []
+        self.local.trace_id = trace_id or uuid.uuid4().hex[:16]
+        try:
+            with self.span(name, dict(args, path=path)):
+                yield
+        finally:
+            events = self.local.events
+            self.local.events = None
+            self.local.trace_id = None
+            self.write(events)
+
+    def record(self, name, start_us, **args):
+        """Records a span that started at start_us (from now_us()) and ends now."""
+        if self.enabled:
+            self.add_event(name, start_us, time.time_ns() // 1000 - start_us, args)
+
+    def write(self, events):
+        if not events:
+            return
+        lines = "".join(json.dumps(event) + ",\n" for event in events)
+        with self.lock:
+            path = self.trace_file()
+            with open(path, "a", encoding="utf-8") as f:
+                if f.tell() == 0:
+                    f.write("[\n")
+                f.write(lines)
+
+tracer = Tracer()
+
+def configure(trace_dir, profile=None, processor=None):
+    tracer.configure(trace_dir, profile, processor)
+
+def now_us():
+    return time.time_ns() // 1000
+
+def trace(name, path, trace_id=None, **args):
+    """Starts the trace of a detected item; spans until it finishes share its trace ID.
+
+    Pass trace_id to continue the trace of an item in another process, e.g. a folder pool worker.
+    """
+    if not tracer.enabled:
+        return NULL_SPAN
+    return tracer.trace(name, path, args, trace_id)
+
+def current_trace_id():
+    """Trace ID of the item traced on this thread, None outside an item or with tracing off."""
+    if not tracer.enabled:
+        return None
+    return tracer.current()[1]
+
+def span(name, **args):
+    """Times a step of the current item."""
+    if not tracer.enabled:
+        return NULL_SPAN
+    return tracer.span(name, args)
+
+def record(name, start_us, **args):
+    tracer.record(name, start_us, **args)
+
+def load_events(path):
+    """Reads an appended trace file, tolerating the missing closing bracket."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+    if not text:
+        return []
+    text = text.rstrip(",")
+    if not text.endswith("]"):
+        text += "]"
+    return json.loads(text)
+
+def export_slowest(pattern, output, top=20):
+    """Writes the events of the slowest items found in the trace files matching pattern."""
+    traces = {}
+    for path in glob.glob(pattern):
+        for event in load_events(path):
+            traces.setdefault(event.get("args", {}).get("trace_id"), []).append(event)
+
+    def total(events):
+        return max(event["ts"] + event["dur"] for event in events) - min(event["ts"] for event in events)
+
+    slowest = sorted(traces.values(), key=total, reverse=True)[:top]
+    selected = []
+    for lane, events in enumerate(slowest, start=1):
+        start = min(event["ts"] for event in events)
+        for event in events:
+            # One timeline lane per item, all starting at zero so they can be compared side by side
+            selected.append(dict(event, pid=1, tid=lane, ts=event["ts"] - start))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": selected, "displayTimeUnit": "ms"}, f)
+    for lane, events in enumerate(slowest, start=1):
+        root = min(events, key=lambda event: event["ts"])
+        print(f"{lane:3d}. {total(events) / 1e6:8.1f}s  {root['args'].get('path')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the slowest items from processor trace files")
+    parser.add_argument('pattern', help='Trace file or glob, e.g. "traces/*_20240101_*.json"')
+    parser.add_argument('--top', type=int, default=20, help='Number of items to keep')
+    parser.add_argument('--output', default='slowest.json', help='Trace file to open in ui.perfetto.dev or chrome://tracing')
+    args = parser.parse_args()
+    export_slowest(args.pattern, args.output, args.top)